@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Prompt Fatigue benchmarks.
+
+Generates deterministic synthetic histories and times every CLI mode, the
+scorer, the history reader, the storage queries and the statusline
+against them. Each size runs on a private copy of the tool with HOME
+pointed at a scratch directory, so your own history and data/ are never
+touched.
+
+    bench/bench.py generate 100k /tmp/history.jsonl
+    bench/bench.py run --sizes 10k,100k --out before.json
+    bench/bench.py compare before.json after.json
+    bench/bench.py startup
+    bench/bench.py parity
+    bench/bench.py freshness
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# Prompt mix: (weight, kind)
+MIX = [
+    (25, 'grunt'),
+    (10, 'lazy'),
+    (30, 'medium'),
+    (15, 'long'),
+    (8, 'paste'),
+    (2, 'image'),
+    (10, 'command'),
+]
+
+GRUNTS = ['yes', 'ok', 'continue', 'go', 'sure', 'do it', 'looks good', 'thanks',
+          'nice', 'y', '1', 'why?', 'fix it', 'again', 'sounds good', 'no']
+LAZY = ['can you maybe make it better', 'idk just fix whatever is broken',
+        'make it work please', 'try again but differently',
+        'same thing for the other one', 'hmm that did not work']
+COMMANDS = ['/clear', '/compact', '/model', '/cost', '[Request interrupted by user]']
+FILES = ['auth.ts', 'config.py', 'storage.py', 'main.go', 'server.rs', 'App.tsx',
+         'parser.js', 'Handler.java']
+FUNCS = ['parse_config', 'load_user', 'retry_request', 'render_table', 'flush_cache']
+THINGS = ['the retry loop', 'the session cache', 'error handling', 'the CLI flags',
+          'pagination', 'the migration']
+PROJECTS = ['/home/dev/api', '/home/dev/web', '/home/dev/cli', '/home/dev/infra',
+            '/home/dev/notes']
+
+
+# Golden analyzer.score_prompt output for a fixed corpus, one JSON object
+# per line; see cmd_parity
+PARITY_PATH = os.path.join(REPO_DIR, 'bench', 'parity.jsonl')
+
+# Prompts the freshness check adds to yesterday through a late export
+LATE_PROMPTS = 20
+
+# Hand-picked prompts at the edges of the scorer's rules
+PARITY_EDGE_CASES = [
+    '', ' ', 'y', 'ok', 'OK.', 'yes!', 'go on', 'thx', '7', 'why?', 'Why?', 'x',
+    "let's do it", 'sounds good!', 'continue.', 'no more',
+    'fix it', 'just fix it', 'can you fix it', 'Could you maybe make it better?',
+    'improve it etc', 'whatever works, something like that',
+    'add a test', 'Add the test', 'refactor this module', 'Refactor it.',
+    'Update auth.ts because the session expires', 'update the config.py, since it fails',
+    'read @notes and /var/log/app.log', 'see line 42: error: KeyError',
+    'call `load_user` in UserService via http://localhost:8080/api',
+    'def parse_config(path) and class ConfigLoader',
+    '- first\n- second\n\n1. third\n# Heading',
+    'the goal is to ensure it must pass; verify and confirm the build',
+    'should should should must must ensure ensure',
+    'For the test, run it for the build because of the test run',
+    'i think maybe it is probably just a quick and easy simple fix',
+    'Do you think it would be possible to check that?',
+    'is it possible to make it work? not sure',
+    'TESTING Verification BECAUSE Acceptance Criteria Requirements',
+    'constraint: the thing has to work and needs to be validated',
+    'this will expect the assertion to fail; should fail and should pass',
+    'justify the forward-thinking approach for fortran fortunes',
+    'unquestionably untested; rerun the rebuild; checkout the branch',
+    'etcetera and so on and so forth, things like that, stuff like this',
+]
+
+# Words the random parity prompts are built from: every marker, some
+# near-misses, and code-like tokens
+PARITY_WORDS = [
+    'because', 'so that', 'in order to', 'for', 'since', 'given that', 'considering',
+    'based on', 'due to', 'the goal is', 'we need', 'the purpose', 'this will',
+    'should', 'must', 'needs to', 'has to', 'make sure', 'ensure', 'verify',
+    'check that', 'confirm', 'validate', 'expect', 'acceptance', 'criteria',
+    'requirements', 'constraint', 'test', 'check', 'run', 'assert', 'should pass',
+    'should fail', 'build', 'maybe', 'possibly', 'perhaps', 'might', 'could be',
+    'i think', 'i guess', 'probably', 'not sure', 'just', 'quick', 'simple', 'easy',
+    'make it better', 'improve it', 'fix it', 'clean it up', 'make it work',
+    'optimize it', 'refactor it', 'something like', 'stuff like', 'things like',
+    'etc', 'and so on', 'whatever', 'Because', 'TEST', 'Ensure', 'testing',
+    'forecast', 'rerun', 'justice', 'builder', 'sincere', 'mustard', 'checkout',
+    'the', 'a', 'this', 'new', 'add', 'create', 'write', 'implement', 'make',
+    'update', 'change', 'fix', 'remove', 'delete', 'refactor', 'handler', 'page',
+    'auth.ts', 'config.py', 'main.go', 'App.tsx', '@utils', '/src/app/main.py',
+    '`retry()`', 'UserService', 'load_user', 'line 12', 'error: Timeout',
+    'https://example.com/x', 'function render', 'class Cache', 'def run',
+    '\n- ', '\n1. ', '\n\n', '\n# ', '.', ',', '?', '!',
+]
+
+PARITY_OPENERS = ['', '', '', 'can you ', 'Could you ', 'would you ', 'do you think ',
+                  'is it possible ', 'Fix ', 'add the ', 'Refactor ', 'please ']
+
+
+def parity_corpus(n: int = 250, seed: int = 1) -> list[str]:
+    """Get the parity prompts: the edge cases plus n seeded random ones."""
+    rng = random.Random(seed)
+    texts = list(PARITY_EDGE_CASES)
+    for _ in range(n):
+        words = rng.choices(PARITY_WORDS, k=rng.randint(1, 25))
+        texts.append(rng.choice(PARITY_OPENERS) + ' '.join(words))
+    return texts
+
+def make_text(rng: random.Random, kind: str) -> tuple:
+    """Get (display, pasted_contents) for one synthetic prompt."""
+    file, func, thing = rng.choice(FILES), rng.choice(FUNCS), rng.choice(THINGS)
+
+    if kind == 'grunt':
+        return rng.choice(GRUNTS), {}
+    if kind == 'lazy':
+        return rng.choice(LAZY), {}
+    if kind == 'command':
+        return rng.choice(COMMANDS), {}
+    if kind == 'medium':
+        return rng.choice([
+            f'Update {file} so {thing} handles empty input',
+            f'Why does `{func}` return None when {thing} is missing?',
+            f'Add a test for {func} in {file} that must cover {thing}',
+            f'Rename {func} across the project and keep @{file} consistent',
+        ]), {}
+    if kind == 'long':
+        return (
+            f'Refactor {thing} in {file} because {func} is doing too much.\n\n'
+            f'- move validation into a `validate_{func}` helper\n'
+            f'- keep the public signature of `{func}` unchanged\n'
+            f'- add tests for the empty and error cases\n\n'
+            f'```\n{func}(None)  # should raise ValueError\n```\n'
+            f'Run the test suite to verify, and ensure nothing else imports the old helper.'
+        ), {}
+    if kind == 'paste':
+        # Mostly small pastes, occasionally a huge log dump
+        size = 200_000 if rng.random() < 0.02 else rng.randint(200, 5_000)
+        lines = size // 40
+        return (f'[Pasted text #1 +{lines} lines] fix the failure in {file}',
+                {'1': {'id': 1, 'type': 'text', 'content': 'E' * size}})
+    return f'[Image #1] what is wrong with {thing} here', {}
+
+
+def generate(n: int, out: str, seed: int = 1, end_ms: int = None):
+    """
+    Write n synthetic history lines ending at end_ms (default: now).
+
+    Prompts come in sessions of bursts separated by breaks, with a few
+    slightly out-of-order timestamps. The output depends only on n, seed
+    and end_ms.
+    """
+    rng = random.Random(seed)
+    end_ms = end_ms or int(time.time() * 1000)
+    kinds = [kind for weight, kind in MIX for _ in range(weight)]
+
+    # Walk back from the end so the newest prompts land today
+    timestamps = []
+    ts = end_ms
+    while len(timestamps) < n:
+        for _ in range(rng.randint(5, 40)):
+            timestamps.append(ts)
+            ts -= rng.randint(20, 180) * 1000
+        ts -= rng.randint(10 * 60, 14 * 3600) * 1000
+    timestamps = timestamps[:n][::-1]
+
+    # About 1% of entries land a few seconds out of order
+    for i in range(1, n):
+        if rng.random() < 0.01:
+            timestamps[i] = timestamps[i - 1] - rng.randint(1, 5) * 1000
+
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        project = rng.choice(PROJECTS)
+        for ts in timestamps:
+            if rng.random() < 0.05:
+                project = rng.choice(PROJECTS)
+            display, pasted = make_text(rng, rng.choice(kinds))
+            f.write(json.dumps({
+                'display': display,
+                'pastedContents': pasted,
+                'timestamp': ts,
+                'project': project,
+            }) + '\n')
+
+
+# CLI scenarios: name -> fatigue arguments
+CLI_SCENARIOS = {
+    'today': ['--today', '--json'],
+    'yesterday': ['--yesterday', '--json'],
+    'week': ['--week', '--json'],
+    'all': ['--all', '--json'],
+    'stamina_trend_session': ['--all', '--stamina', '--trend', '--session', '--json'],
+}
+
+# Cold-start budgets in seconds for a fresh process once data/ is built:
+# fatigue arguments -> slowest acceptable median
+STARTUP_BUDGETS = {
+    ('--version',): 0.10,
+    ('--yesterday', '--json'): 0.15,
+    ('--today', '--json'): 0.25,
+    ('--week', '--json'): 0.25,
+    ('--shame', '--json'): 0.35,
+}
+
+# In-process scenarios: name -> code timed after imports (lib is on sys.path)
+PY_SCENARIOS = {
+    'score_throughput': (
+        "import analyzer, history\n"
+        "texts = [p.text for p in history.read_history()][:50000]\n"
+        "start = time.perf_counter()\n"
+        "analyzer.score_prompts(texts)\n"
+    ),
+    'read_history': (
+        "import history\n"
+        "start = time.perf_counter()\n"
+        "sum(1 for _ in history.read_history())\n"
+    ),
+    'storage_queries': (
+        "import storage\n"
+        "start = time.perf_counter()\n"
+        "storage.get_hour_dow_matrix(); storage.get_weekly_averages(weeks=8); storage.get_score_count()\n"
+    ),
+}
+
+PY_HARNESS = (
+    "import sys, time\n"
+    "sys.path.insert(0, {lib!r})\n"
+    "{code}"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+class Sandbox:
+    """A private copy of the tool plus a scratch HOME holding a history file."""
+
+    def __init__(self, root: str):
+        self.repo = os.path.join(root, 'repo')
+        self.home = os.path.join(root, 'home')
+        self.history = os.path.join(self.home, '.claude', 'history.jsonl')
+        self.status_cache = os.path.join(root, 'status-cache')
+        # Never reach a real --daemon, which would answer for the fallback
+        self.socket = os.path.join(root, 'daemon.sock')
+
+        ignore = shutil.ignore_patterns('__pycache__', 'data', '.git', 'bench')
+        shutil.copytree(REPO_DIR, self.repo, ignore=ignore)
+        self.env = dict(os.environ, HOME=self.home, FATIGUE_STATUS_CACHE=self.status_cache,
+                        FATIGUE_SOCKET=self.socket)
+
+    def reset_data(self):
+        """Drop the copy's stored scores, snapshot and index."""
+        shutil.rmtree(os.path.join(self.repo, 'data'), ignore_errors=True)
+
+    def run(self, args: list, stdin=None):
+        subprocess.run(args, env=self.env, cwd=self.repo, stdin=stdin, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def fatigue(self, *args):
+        self.run([sys.executable, os.path.join(self.repo, 'fatigue'), *args])
+
+    def fatigue_json(self, *args) -> dict:
+        result = subprocess.run([sys.executable, os.path.join(self.repo, 'fatigue'), *args, '--json'],
+                                env=self.env, cwd=self.repo, check=True,
+                                capture_output=True, text=True)
+        return json.loads(result.stdout)
+
+    def python(self, code: str) -> float:
+        harness = PY_HARNESS.format(lib=os.path.join(self.repo, 'lib'), code=code)
+        result = subprocess.run([sys.executable, '-c', harness], env=self.env,
+                                cwd=self.repo, check=True, capture_output=True, text=True)
+        return float(result.stdout.split()[-1])
+
+
+def timed(fn, repeat: int) -> dict:
+    """Time fn repeat times; fn may return its own measurement in seconds."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        measured = fn()
+        runs.append(measured if measured is not None else time.perf_counter() - start)
+    return {'median': statistics.median(runs), 'min': min(runs), 'runs': runs}
+
+
+def bench_size(name: str, n: int, repeat: int, seed: int) -> dict:
+    """Run every scenario against one synthetic history size."""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='fatigue-bench-') as root:
+        box = Sandbox(root)
+        generate(n, box.history, seed=seed)
+
+        # First run: ingest, score and build the snapshot from scratch
+        def cold():
+            box.reset_data()
+            box.fatigue('--all', '--json')
+        results['cold_all'] = timed(cold, repeat)
+
+        for scenario, args in CLI_SCENARIOS.items():
+            results[scenario] = timed(lambda: box.fatigue(*args), repeat)
+
+        for scenario, code in PY_SCENARIOS.items():
+            results[scenario] = timed(lambda: box.python(code), repeat)
+
+        statusline = ['bash', os.path.join(box.repo, 'statusline.sh')]
+
+        def statusline_cold():
+            if os.path.exists(box.status_cache):
+                os.unlink(box.status_cache)
+            box.run(statusline, stdin=subprocess.DEVNULL)
+        results['statusline_cold'] = timed(statusline_cold, repeat)
+        results['statusline_cached'] = timed(
+            lambda: box.run(statusline, stdin=subprocess.DEVNULL), repeat)
+
+    print(f'  {name}: ' + ', '.join(f'{k} {v["median"]:.3f}s' for k, v in results.items()),
+          file=sys.stderr)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cmd_run(args):
+    sizes = args.sizes.split(',')
+    for size in sizes:
+        if size not in SIZES:
+            sys.exit(f'Unknown size {size!r} (choose from {", ".join(SIZES)})')
+
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': {},
+    }
+    for size in sizes:
+        report['results'][size] = bench_size(size, SIZES[size], args.repeat, args.seed)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+def cmd_compare(args):
+    """Flag scenarios whose median got slower than threshold allows."""
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    with open(args.current) as f:
+        current = json.load(f)['results']
+
+    regressions = 0
+    print(f'{"size":6s} {"scenario":24s} {"baseline":>10s} {"current":>10s} {"change":>8s}')
+    for size, scenarios in current.items():
+        for scenario, result in scenarios.items():
+            before = baseline.get(size, {}).get(scenario)
+            if not before:
+                continue
+            change = result['median'] / before['median'] - 1 if before['median'] else 0
+            flag = ''
+            if change > args.threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            print(f'{size:6s} {scenario:24s} {before["median"]:9.3f}s {result["median"]:9.3f}s '
+                  f'{change:+7.0%}{flag}')
+
+    if regressions:
+        print(f'\n{regressions} regression(s) over {args.threshold:.0%}')
+        sys.exit(1)
+
+
+def cmd_startup(args):
+    """Time each mode's startup on warm data; fail if any is over budget."""
+    if args.size not in SIZES:
+        sys.exit(f'Unknown size {args.size!r} (choose from {", ".join(SIZES)})')
+
+    over = 0
+    with tempfile.TemporaryDirectory(prefix='fatigue-bench-') as root:
+        box = Sandbox(root)
+        generate(SIZES[args.size], box.history, seed=args.seed)
+
+        print(f'{"mode":24s} {"median":>8s} {"budget":>8s}')
+        for mode, budget in STARTUP_BUDGETS.items():
+            box.fatigue(*mode)   # Build whatever this mode keeps in data/
+            median = timed(lambda: box.fatigue(*mode), args.repeat)['median']
+            flag = ''
+            if median > budget:
+                flag = '  OVER BUDGET'
+                over += 1
+            print(f'{" ".join(mode):24s} {median:7.3f}s {budget:7.3f}s{flag}')
+
+    if over:
+        print(f'\n{over} mode(s) over their startup budget')
+        sys.exit(1)
+
+
+def cmd_parity(args):
+    """Check analyzer.score_prompt still gives the golden output for the parity corpus."""
+    from dataclasses import asdict
+    sys.path.insert(0, os.path.join(REPO_DIR, 'lib'))
+    import analyzer
+
+    if args.update:
+        with open(PARITY_PATH, 'w') as f:
+            for text in parity_corpus():
+                f.write(json.dumps({'text': text, 'score': asdict(analyzer.score_prompt(text))},
+                                   sort_keys=True) + '\n')
+        print(f'Wrote {PARITY_PATH}')
+        return
+
+    mismatches = 0
+    with open(PARITY_PATH) as f:
+        cases = [json.loads(line) for line in f]
+    for case in cases:
+        # Round-trip through JSON so tuples and floats compare like the golden file
+        got = json.loads(json.dumps(asdict(analyzer.score_prompt(case['text']))))
+        if got != case['score']:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f'MISMATCH {case["text"]!r}\n  expected {case["score"]}\n  got      {got}')
+
+    if mismatches:
+        print(f'\n{mismatches} of {len(cases)} prompts differ from {PARITY_PATH}')
+        sys.exit(1)
+    print(f'{len(cases)} prompts match {os.path.relpath(PARITY_PATH)}')
+
+def cmd_freshness(args):
+    """Check stored finished days pick up prompts a source gains for them later."""
+    with tempfile.TemporaryDirectory(prefix='fatigue-bench-') as root:
+        box = Sandbox(root)
+        generate(SIZES['10k'], box.history, seed=args.seed)
+        export = os.path.join(root, 'exports', 'host2.jsonl')
+        generate(1_000, export, seed=args.seed + 1)
+        sources = ['--source', box.history, '--source', os.path.dirname(export)]
+        yesterday = date.today() - timedelta(days=1)
+
+        def counts() -> tuple:
+            """Yesterday's prompt count from --yesterday, then from --week."""
+            day = box.fatigue_json('--yesterday', *sources)['summary']['prompts_analyzed']
+            week = box.fatigue_json('--week', *sources)['daily']
+            return day, next(d['prompts'] for d in week if d['date'] == yesterday.isoformat())
+
+        # Both store yesterday, so the next runs can answer from the store
+        before = counts()
+
+        # Another machine's export arrives late, with prompts from yesterday
+        noon = datetime.combine(yesterday, datetime.min.time()) + timedelta(hours=12)
+        with open(export, 'a') as f:
+            for i in range(LATE_PROMPTS):
+                f.write(json.dumps({
+                    'display': f'Late prompt {i}: add retries to the upload client and test them',
+                    'pastedContents': {},
+                    'timestamp': int(noon.timestamp() * 1000) + i,
+                    'project': PROJECTS[0],
+                }) + '\n')
+        after = counts()
+
+    expected = before[0] + LATE_PROMPTS
+    print(f'yesterday before: --yesterday {before[0]}, --week {before[1]}')
+    print(f'yesterday after {LATE_PROMPTS} late prompts: --yesterday {after[0]}, '
+          f'--week {after[1]} (expected {expected})')
+    if before[0] != before[1] or after != (expected, expected):
+        print('\nStored days went stale')
+        sys.exit(1)
+
+
+def cmd_generate(args):
+    if args.size not in SIZES:
+        sys.exit(f'Unknown size {args.size!r} (choose from {", ".join(SIZES)})')
+    generate(SIZES[args.size], args.out, seed=args.seed, end_ms=args.end)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark prompt-fatigue on synthetic history')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help='Write a synthetic history.jsonl')
+    gen.add_argument('size', help=f'One of {", ".join(SIZES)}')
+    gen.add_argument('out', help='Output path')
+    gen.add_argument('--seed', type=int, default=1)
+    gen.add_argument('--end', type=int, help='Newest timestamp in epoch millis (default: now)')
+    gen.set_defaults(func=cmd_generate)
+
+    run = sub.add_parser('run', help='Time every scenario, output JSON')
+    run.add_argument('--sizes', default='10k,100k',
+                     help=f'Comma-separated sizes from {", ".join(SIZES)} (default: 10k,100k)')
+    run.add_argument('--repeat', type=int, default=3, help='Runs per scenario (default: 3)')
+    run.add_argument('--seed', type=int, default=1)
+    run.add_argument('--out', help='Write results here instead of stdout')
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser('compare', help='Flag regressions against a baseline')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.2,
+                         help='Allowed slowdown before flagging (default: 0.2 = 20%%)')
+    compare.set_defaults(func=cmd_compare)
+
+    startup = sub.add_parser('startup', help='Check each mode starts within its budget')
+    startup.add_argument('--size', default='10k',
+                         help=f'History size from {", ".join(SIZES)} (default: 10k)')
+    startup.add_argument('--repeat', type=int, default=5, help='Runs per mode (default: 5)')
+    startup.add_argument('--seed', type=int, default=1)
+    startup.set_defaults(func=cmd_startup)
+
+    parity = sub.add_parser('parity', help='Check scores against the golden parity corpus')
+    parity.add_argument('--update', action='store_true',
+                        help='Rewrite the golden file from the current scorer')
+    parity.set_defaults(func=cmd_parity)
+
+    freshness = sub.add_parser('freshness',
+                               help='Check stored days see prompts a source adds for them later')
+    freshness.add_argument('--seed', type=int, default=1)
+    freshness.set_defaults(func=cmd_freshness)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
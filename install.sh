@@ -12,7 +12,7 @@ mkdir -p "$INSTALL_DIR/lib"
 # Copy only necessary files (not .git, __pycache__, etc.)
 cp fatigue "$INSTALL_DIR/"
 cp statusline.sh "$INSTALL_DIR/"
-cp lib/__init__.py lib/analyzer.py lib/history.py lib/storage.py lib/report.py "$INSTALL_DIR/lib/"
+cp lib/__init__.py lib/analyzer.py lib/archive.py lib/history.py lib/history_sources.py lib/ingest.py lib/metrics.py lib/report.py lib/scoring.py lib/snapshot.py lib/statusd.py lib/storage.py lib/timings.py lib/watch.py "$INSTALL_DIR/lib/"
 cp SKILL.md "$INSTALL_DIR/"
 
 # Set permissions
@@ -7,6 +7,7 @@ Based on research from:
 - Community prompting guidelines
 """
 
+import os
 import re
 from dataclasses import dataclass
 
@@ -106,56 +107,120 @@ VAGUE_TERMS = [
 ]
 
 
+# === MATCHER ENGINE ===
+# Everything above is compiled once at import so scoring a prompt is a
+# handful of passes over the text instead of one per pattern.
+
+# Literal marker lists, counted as "how many distinct markers occur"
+MARKER_LISTS = {
+    'context': CONTEXT_MARKERS,
+    'criteria': CRITERIA_MARKERS,
+    'verification': VERIFICATION_MARKERS,
+    'hedge': HEDGE_WORDS,
+    'vague': VAGUE_TERMS,
+}
+
+
+def _trie_pattern(node: dict) -> str:
+    """Emit a regex for a character trie; greedy optionals keep the longest hit."""
+    branches = [re.escape(char) + _trie_pattern(child)
+                for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return f'(?:{body})?' if '' in node else body
+
+
+def _build_marker_matcher():
+    """
+    Merge all marker lists into one trie-shaped alternation.
+
+    The lookahead finds the longest marker starting at every position. Any
+    other marker starting there is a prefix of it, so each marker carries
+    its prefix closure and one scan finds every marker that occurs.
+    """
+    markers = {m.lower() for ms in MARKER_LISTS.values() for m in ms}
+
+    trie = {}
+    for marker in markers:
+        node = trie
+        for char in marker:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    closure = {m: frozenset(p for p in markers if m.startswith(p)) for m in markers}
+    pattern = re.compile('(?=(' + _trie_pattern(trie) + '))')
+    membership = {name: frozenset(m.lower() for m in ms)
+                  for name, ms in MARKER_LISTS.items()}
+    return pattern, closure, membership
+
+
+_MARKER_RE, _MARKER_CLOSURE, _MARKER_MEMBERSHIP = _build_marker_matcher()
+
+_SPECIFICITY_RES = [re.compile(p, re.IGNORECASE | re.MULTILINE)
+                    for p in SPECIFICITY_PATTERNS]
+_IMPERATIVE_RE = re.compile('|'.join(IMPERATIVE_PATTERNS), re.IGNORECASE | re.MULTILINE)
+_STRUCTURE_RE = re.compile('|'.join(STRUCTURE_PATTERNS), re.MULTILINE)
+_LAZY_RE = re.compile('|'.join(f'(?:{p})' for p in LAZY_PATTERNS), re.IGNORECASE)
+_PASSIVE_QUESTION_RE = re.compile('|'.join(PASSIVE_QUESTION_PATTERNS))
+
+
 def count_words(text: str) -> int:
     """Count words in text."""
     return len(text.split())
 
 
-def count_matches(text: str, patterns: list, is_regex: bool = False) -> int:
-    """Count matches for a list of patterns."""
-    text_lower = text.lower()
-    count = 0
-    for pattern in patterns:
-        if is_regex:
-            count += len(re.findall(pattern, text, re.IGNORECASE | re.MULTILINE))
-        else:
-            if pattern.lower() in text_lower:
-                count += 1
-    return count
+def find_markers(text_lower: str) -> set:
+    """Find every literal marker occurring in lower-cased text."""
+    found = set()
+    for match in _MARKER_RE.finditer(text_lower):
+        found |= _MARKER_CLOSURE[match.group(1)]
+    return found
+
+
+def count_specificity(text: str) -> int:
+    """Count concrete references (files, code, identifiers, URLs)."""
+    return sum(len(rx.findall(text)) for rx in _SPECIFICITY_RES)
 
 
 def has_structure(text: str) -> bool:
     """Check if text has structural elements."""
-    for pattern in STRUCTURE_PATTERNS:
-        if re.search(pattern, text, re.MULTILINE):
-            return True
-    return False
+    return _STRUCTURE_RE.search(text) is not None
 
 
 def is_lazy(text: str) -> bool:
     """Check if text matches lazy/grunt patterns."""
-    text_stripped = text.strip()
-    for pattern in LAZY_PATTERNS:
-        if re.match(pattern, text_stripped, re.IGNORECASE):
-            return True
-    return False
+    return _LAZY_RE.match(text.strip()) is not None
 
 
 def has_passive_question(text: str) -> bool:
     """Check if text starts with passive question format."""
-    text_lower = text.lower().strip()
-    for pattern in PASSIVE_QUESTION_PATTERNS:
-        if re.match(pattern, text_lower):
-            return True
-    return False
+    return _PASSIVE_QUESTION_RE.match(text.lower().strip()) is not None
 
 
 def has_imperative(text: str) -> bool:
     """Check if text uses imperative/action language."""
-    for pattern in IMPERATIVE_PATTERNS:
-        if re.search(pattern, text, re.IGNORECASE | re.MULTILINE):
-            return True
-    return False
+    return _IMPERATIVE_RE.search(text) is not None
+
+
+def match_signals(text: str) -> dict:
+    """
+    Collect every signal count for a prompt in one go.
+
+    Returns dict with specificity, the per-list marker counts (context,
+    criteria, verification, hedge, vague), structure, imperative and
+    passive_question.
+    """
+    text_lower = text.lower()
+    found = find_markers(text_lower)
+
+    signals = {name: len(found & members)
+               for name, members in _MARKER_MEMBERSHIP.items()}
+    signals['specificity'] = count_specificity(text)
+    signals['structure'] = has_structure(text)
+    signals['imperative'] = has_imperative(text)
+    signals['passive_question'] = _PASSIVE_QUESTION_RE.match(text_lower.strip()) is not None
+    return signals
 
 
 def score_prompt(text: str) -> Score:
@@ -182,41 +247,42 @@ def score_prompt(text: str) -> Score:
     # === Calculate positive signals ===
     word_count = count_words(text)
     char_count = len(text)
+    signals = match_signals(text)
 
     # Specificity (0-2.5): concrete references
-    specificity = count_matches(text, SPECIFICITY_PATTERNS, is_regex=True)
+    specificity = signals['specificity']
     specificity_score = min(2.5, specificity * 0.5)
 
     # Context (0-2.5): reasoning indicators
-    context = count_matches(text, CONTEXT_MARKERS)
+    context = signals['context']
     context_score = min(2.5, context * 0.6)
 
     # Clarity (0-2): imperative vs passive
     clarity_score = 0.0
-    if has_imperative(text):
+    if signals['imperative']:
         clarity_score += 1.5
-    if not has_passive_question(text):
+    if not signals['passive_question']:
         clarity_score += 0.5
     clarity_score = min(2.0, clarity_score)
 
     # Constraints/criteria (0-1.5): acceptance criteria
-    criteria = count_matches(text, CRITERIA_MARKERS)
+    criteria = signals['criteria']
     criteria_score = min(1.5, criteria * 0.4)
 
     # Verification (0-1.5): testing mentions
-    verification = count_matches(text, VERIFICATION_MARKERS)
+    verification = signals['verification']
     verification_score = min(1.5, verification * 0.4)
 
     # === Calculate negative signals (penalties) ===
-    hedge_count = count_matches(text, HEDGE_WORDS)
+    hedge_count = signals['hedge']
     hedge_penalty = min(1.5, hedge_count * 0.3)
 
-    vague_count = count_matches(text, VAGUE_TERMS)
+    vague_count = signals['vague']
     vague_penalty = min(1.0, vague_count * 0.5)
 
     # === Bonus signals ===
     # Structure bonus
-    structure_bonus = 0.5 if has_structure(text) else 0.0
+    structure_bonus = 0.5 if signals['structure'] else 0.0
 
     # Length bonus (reasonable length indicates effort)
     # <10 words = 0, 10-30 = 0.5, 30+ = 1
@@ -250,8 +316,8 @@ def score_prompt(text: str) -> Score:
         'context_markers': context,
         'criteria_markers': criteria,
         'verification_markers': verification,
-        'has_structure': has_structure(text),
-        'has_imperative': has_imperative(text),
+        'has_structure': signals['structure'],
+        'has_imperative': signals['imperative'],
         'hedge_words': hedge_count,
         'vague_terms': vague_count,
         'scores': {
@@ -282,6 +348,56 @@ def score_prompt(text: str) -> Score:
     return Score(round(total, 1), category, breakdown, confidence)
 
 
+# Below this many prompts a process pool costs more than it saves
+PARALLEL_THRESHOLD = 10000
+
+# Breakdown counts score_prompts returns, in this order
+BREAKDOWN_COUNTS = (
+    'words', 'chars', 'specificity', 'context_markers', 'criteria_markers',
+    'verification_markers', 'has_structure', 'has_imperative', 'hedge_words',
+    'vague_terms',
+)
+
+
+def compact_score(text: str) -> tuple:
+    """
+    Score a prompt down to (total, category, counts).
+
+    counts follow BREAKDOWN_COUNTS, and are empty for prompts rejected
+    before anything was counted (empty or lazy). Small enough to send
+    back from a pool worker cheaply.
+    """
+    score = score_prompt(text)
+    if 'reason' in score.breakdown:
+        return score.total, score.category, ()
+    return score.total, score.category, tuple(score.breakdown[name] for name in BREAKDOWN_COUNTS)
+
+
+def score_prompts(texts, workers: int = 1) -> list[tuple]:
+    """
+    Score many prompts, spreading them across processes if worthwhile.
+
+    Args:
+        texts: Iterable of prompt texts
+        workers: Number of processes (0 = one per CPU)
+
+    Returns:
+        (total, category, counts) tuples in input order, as from
+        compact_score
+    """
+    texts = list(texts)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(texts) < PARALLEL_THRESHOLD:
+        return [compact_score(text) for text in texts]
+
+    # A few chunks per worker keeps them busy without flooding the queue
+    chunksize = max(1, len(texts) // (workers * 4))
+    from multiprocessing import Pool
+    with Pool(workers) as pool:
+        return pool.map(compact_score, texts, chunksize=chunksize)
+
+
 def categorize_score(score: float) -> str:
     """Get category name for a score."""
     if score <= 2:
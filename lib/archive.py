@@ -0,0 +1,171 @@
+"""
+History compaction - copies old history into compressed monthly segments.
+
+history.jsonl only ever grows, so every scan of it gets slower. compact
+copies lines older than a horizon into one gzip segment per month under
+history_sources.ARCHIVE_DIR. Each segment opens with a header line giving
+its time range, so readers skip segments outside their window.
+
+The history file itself is left alone, since Claude Code keeps appending
+to it. Instead compact records a watermark, the offset the archived lines
+end at, and ingestion and the daemon start reading the file there.
+Segments stay default history sources, so reports still see everything,
+but a report only reads the segments that reach into its window. Stored
+scores and their rollups are left alone.
+"""
+
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+import history
+import history_sources
+
+# Default age in days past which history is archived
+HORIZON_DAYS = 90
+
+# Held while compacting, so two runs don't both merge into a segment
+LOCK_PATH = os.path.join(history_sources.ARCHIVE_DIR, 'lock')
+
+
+class _Segment:
+    """A month's segment being written: body to a temp file, header last."""
+
+    def __init__(self, month: str):
+        self.path = os.path.normpath(os.path.join(history_sources.ARCHIVE_DIR, f'{month}.jsonl.gz'))
+        self.body_path = self.path + '.body.tmp'
+        self.body = gzip.open(self.body_path, 'wb')
+        self.start = None
+        self.end = None
+        self.count = 0
+        # Digests of the lines written, to skip ones already archived
+        self.held = set()
+
+        # Compacting into an existing month keeps what it already holds
+        if os.path.exists(self.path):
+            for _, line in history.iter_lines(self.path):
+                self.write(line, _line_timestamp(line))
+
+    def write(self, line: bytes, timestamp: int):
+        self.body.write(line)
+        self.held.add(_digest(line))
+        self.start = timestamp if self.start is None else min(self.start, timestamp)
+        self.end = timestamp if self.end is None else max(self.end, timestamp)
+        self.count += 1
+
+    def discard(self):
+        """Leave the segment as it was."""
+        self.body.close()
+        os.unlink(self.body_path)
+
+    def finish(self):
+        """Write the header as its own gzip member, then the body, and swap it in."""
+        self.body.close()
+        header = {'segment': {'start': self.start, 'end': self.end, 'count': self.count}}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress(json.dumps(header).encode() + b'\n'))
+            with open(self.body_path, 'rb') as body:
+                shutil.copyfileobj(body, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        os.unlink(self.body_path)
+
+
+def _digest(line: bytes) -> bytes:
+    """Hash a history line, to remember it without holding on to it."""
+    return hashlib.blake2b(line, digest_size=16).digest()
+
+
+def _line_timestamp(line: bytes) -> int:
+    """Get a history line's timestamp, or None if it can't be read."""
+    timestamp = history.peek_timestamp(line)
+    if timestamp is None:
+        entry = history.parse_entry(line)
+        if entry is None or not entry[0]:
+            return None
+        timestamp = entry[0]
+    return int(timestamp)
+
+
+def _save_watermark(path: str, offset: int):
+    """Record that path is archived up to offset, replacing the file atomically."""
+    watermarks = history_sources.load_watermarks()
+    watermarks[path] = {
+        'inode': os.stat(path).st_ino,
+        'offset': offset,
+        'fingerprint': history_sources.read_fingerprint(path, offset).hex(),
+    }
+    tmp_path = history_sources.WATERMARKS_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(watermarks, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, history_sources.WATERMARKS_PATH)
+
+
+def compact(horizon_days: int = HORIZON_DAYS, path: str = None) -> dict:
+    """
+    Copy history older than horizon_days into monthly segments.
+
+    Reads on from the last watermark and stops at the first line newer
+    than the horizon, so the archived lines are always a prefix of the
+    file. Lines in it that can't be read are passed over, as every reader
+    drops them anyway. Segments are written and synced before the
+    watermark moves, so an interrupted run leaves lines in both places at
+    worst, which readers drop as repeats.
+
+    Returns:
+        Dict with the 'archived' line count, the 'segments' written, the
+        history file's 'size' and the 'offset' readers now start from
+    """
+    path = os.path.realpath(path or history.HISTORY_PATH)
+    result = {'archived': 0, 'segments': [], 'size': 0, 'offset': 0}
+    if not os.path.exists(path):
+        return result
+
+    cutoff = (datetime.now().timestamp() - horizon_days * 86400) * 1000
+    os.makedirs(history_sources.ARCHIVE_DIR, exist_ok=True)
+
+    with open(LOCK_PATH, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        start = history_sources.archived_offset(path)
+        result['size'] = os.path.getsize(path)
+        result['offset'] = start
+
+        segments = {}
+        grown = set()
+        for offset, line in history.iter_lines(path, start):
+            timestamp = _line_timestamp(line)
+            if timestamp is not None and timestamp >= cutoff:
+                break
+            result['offset'] = offset
+            if timestamp is None:
+                continue
+
+            month = datetime.fromtimestamp(timestamp / 1000).strftime('%Y-%m')
+            if month not in segments:
+                segments[month] = _Segment(month)
+            # Already there if a rewritten history file is compacted again
+            if _digest(line) in segments[month].held:
+                continue
+            segments[month].write(line, timestamp)
+            grown.add(month)
+            result['archived'] += 1
+
+        for month in sorted(segments):
+            if month not in grown:
+                segments[month].discard()
+                continue
+            segments[month].finish()
+            result['segments'].append(segments[month].path)
+
+        if result['offset'] > start:
+            _save_watermark(path, result['offset'])
+    return result
@@ -2,12 +2,33 @@
 History parser - reads and processes ~/.claude/history.jsonl
 """
 
+import hashlib
+import heapq
 import json
+import mmap
 import os
 import re
+import zlib
+from array import array
+from bisect import bisect_left
 from datetime import datetime, timedelta
 from dataclasses import dataclass
-from typing import Iterator
+from itertools import islice
+from operator import itemgetter
+from typing import Iterator, Union
+
+import timings
+from history_sources import HISTORY_PATH, SEGMENT_KEY, open_source
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 @dataclass
@@ -20,12 +41,26 @@ class Prompt:
     raw_display: str       # Original display field
 
 
-HISTORY_PATH = os.path.expanduser("~/.claude/history.jsonl")
-
 # Pattern to strip pasted text markers
 PASTE_PATTERN = re.compile(r'\[Pasted text #\d+ \+\d+ lines\]')
 IMAGE_PATTERN = re.compile(r'\[Image #\d+\]')
 
+# Sparse timestamp -> byte offset index, one sidecar per history file
+INDEX_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'index')
+INDEX_STRIDE = 1000     # Lines per index block
+INDEX_HEADER = 5        # inode, indexed_end, crc, running_max, open_lines
+TS_MAX = 2 ** 63 - 1
+
+# Byte-level timestamp scan, to skip out-of-window lines before decoding
+TIMESTAMP_KEY = b'"timestamp":'
+TIMESTAMP_VALUE = re.compile(rb'\s*(\d+)\s*[,}]')
+
+# Bytes per range handed to each parse worker; smaller reads stay serial
+PARALLEL_RANGE_SIZE = 4 * 1024 * 1024
+
+# How many lines late a source's line can be and still be merged in place
+REORDER_WINDOW = 256
+
 
 def strip_paste_markers(text: str) -> str:
     """Remove pasted text and image markers from display text."""
@@ -39,6 +74,409 @@ def is_command(text: str) -> bool:
     return text.startswith('/') or text.startswith('[')
 
 
+def time_window(
+    days: int = None,
+    today_only: bool = False,
+    yesterday_only: bool = False
+) -> tuple:
+    """
+    Resolve window options to (cutoff_ts, cutoff_end_ts) in epoch millis.
+
+    Either bound is None when the window is open on that side.
+    """
+    cutoff_ts = None
+    cutoff_end_ts = None
+
+    if today_only:
+        # Midnight today
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        cutoff_ts = today_start.timestamp() * 1000
+    elif yesterday_only:
+        # Yesterday midnight to today midnight
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        yesterday_start = today_start - timedelta(days=1)
+        cutoff_ts = yesterday_start.timestamp() * 1000
+        cutoff_end_ts = today_start.timestamp() * 1000
+    elif days:
+        cutoff_ts = (datetime.now().timestamp() - days * 86400) * 1000
+
+    return cutoff_ts, cutoff_end_ts
+
+
+def peek_timestamp(line: bytes) -> int:
+    """
+    Pull the timestamp out of a raw history line without decoding it.
+
+    Returns None unless the line has exactly one integer "timestamp" key,
+    in which case callers fall back to a full decode.
+    """
+    pos = line.find(TIMESTAMP_KEY)
+    if pos < 0 or line.find(TIMESTAMP_KEY, pos + 1) >= 0:
+        return None
+    match = TIMESTAMP_VALUE.match(line, pos + len(TIMESTAMP_KEY))
+    return int(match.group(1)) if match else None
+
+
+def _is_truthy(raw: bytes) -> bool:
+    """Check a raw JSON value is non-empty, without decoding a large one."""
+    if len(raw) > 16:
+        return True
+    return bool(raw) and bool(json.loads(bytes(raw)))
+
+
+if msgspec is not None:
+    class _Entry(msgspec.Struct):
+        """The fields of a history line we use; pastes stay undecoded."""
+        display: str = ''
+        timestamp: Union[int, float] = 0
+        project: str = ''
+        pastedContents: msgspec.Raw = msgspec.field(default_factory=msgspec.Raw)
+
+    _ENTRY_DECODER = msgspec.json.Decoder(_Entry)
+
+    def parse_entry(line: bytes) -> tuple:
+        """Decode a history line to (timestamp, project, display, has_paste)."""
+        try:
+            e = _ENTRY_DECODER.decode(line)
+        except msgspec.DecodeError:
+            return None
+        return e.timestamp, e.project, e.display, _is_truthy(e.pastedContents)
+
+else:
+    _loads = orjson.loads if orjson is not None else json.loads
+
+    def parse_entry(line: bytes) -> tuple:
+        """Decode a history line to (timestamp, project, display, has_paste)."""
+        try:
+            entry = _loads(line)
+        except ValueError:
+            return None
+        return (
+            entry.get('timestamp', 0),
+            entry.get('project', ''),
+            entry.get('display', ''),
+            bool(entry.get('pastedContents', {}))
+        )
+
+
+def iter_lines(path: str = HISTORY_PATH, start: int = 0,
+               stop: int = None) -> Iterator[tuple]:
+    """
+    Read raw history lines starting at a byte offset.
+
+    Reading ends at the first line starting at or after stop, if given.
+
+    A trailing line without a newline is still being written and is left
+    for the next read. Offsets into archives count decompressed bytes, and
+    an archived segment's header line is skipped.
+
+    Yields:
+        (end_offset, line) tuples, end_offset being the byte offset just
+        past the line
+    """
+    with open_source(path) as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if stop is not None and offset >= stop:
+                break
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            if offset == len(line) and line.startswith(SEGMENT_KEY):
+                continue
+            yield offset, line
+
+
+def split_ranges(path: str, start: int = 0, stop: int = None,
+                 size: int = None) -> list[tuple]:
+    """
+    Split part of a file into (start, stop) ranges of about size bytes
+    (default: PARALLEL_RANGE_SIZE).
+
+    Every range but the last ends just past a newline, so reading each
+    with iter_lines covers every line exactly once.
+    """
+    size = size or PARALLEL_RANGE_SIZE
+    end = os.path.getsize(path) if stop is None else stop
+    ranges = []
+    with open(path, 'rb') as f:
+        while start + size < end:
+            f.seek(start + size)
+            f.readline()
+            cut = min(f.tell(), end)
+            ranges.append((start, cut))
+            start = cut
+    if start < end or not ranges:
+        ranges.append((start, stop))
+    return ranges
+
+
+def iter_entries(path: str = HISTORY_PATH, start: int = 0, stop: int = None,
+                 cutoff_ts: float = None, cutoff_end_ts: float = None) -> Iterator[tuple]:
+    """
+    Read decoded history entries starting at a byte offset.
+
+    Lines whose timestamp is plainly outside [cutoff_ts, cutoff_end_ts)
+    are dropped before decoding.
+
+    Yields:
+        (end_offset, (timestamp, project, display, has_paste)) tuples
+    """
+    read = skipped = bad = 0
+    try:
+        for offset, line in iter_lines(path, start, stop):
+            read += 1
+            if cutoff_ts or cutoff_end_ts:
+                timestamp = peek_timestamp(line)
+                if timestamp is not None and (
+                        (cutoff_ts and timestamp < cutoff_ts)
+                        or (cutoff_end_ts and timestamp >= cutoff_end_ts)):
+                    skipped += 1
+                    continue
+
+            entry = parse_entry(line)
+            if entry is None:
+                bad += 1
+            else:
+                yield offset, entry
+    finally:
+        timings.count('lines read', read)
+        timings.count('lines skipped by cutoff', skipped)
+        timings.count('lines unparseable', bad)
+
+
+def _tail_crc(f, offset: int) -> int:
+    """Checksum the bytes just before offset, to spot in-place rewrites."""
+    start = max(0, offset - 64)
+    f.seek(start)
+    return zlib.crc32(f.read(offset - start))
+
+
+def index_path(path: str) -> str:
+    """Get the sidecar index file of a history file."""
+    name = hashlib.sha1(os.path.realpath(path).encode()).hexdigest()[:16]
+    return os.path.join(INDEX_DIR, f'{name}.idx')
+
+
+def load_index(path: str = HISTORY_PATH) -> array:
+    """
+    Load a history file's sidecar index, extending it over lines appended since.
+
+    The index is a flat int64 array: a header, then one (offset,
+    max_before, block_min) triple every INDEX_STRIDE lines. max_before is
+    the newest timestamp before offset and block_min the oldest in the
+    block starting there, so both hold even if lines are slightly out of
+    order.
+    """
+    st = os.stat(path)
+    sidecar = index_path(path)
+    index = array('q')
+    if os.path.exists(sidecar):
+        with open(sidecar, 'rb') as f:
+            index.frombytes(f.read())
+
+    with open(path, 'rb') as f:
+        if (len(index) < INDEX_HEADER + 3
+                or index[0] != st.st_ino
+                or index[1] > st.st_size
+                or index[2] != _tail_crc(f, index[1])):
+            index = array('q', [st.st_ino, 0, 0, -1, 0, 0, -1, TS_MAX])
+
+    end, running_max, open_lines = index[1], index[3], index[4]
+    if end == st.st_size:
+        return index
+
+    block_min = index[-1]
+    for offset, line in iter_lines(path, end):
+        # Lines without a timestamp are indexed past too, so a file ending
+        # in them isn't reindexed on every read
+        end = offset
+        timestamp = peek_timestamp(line)
+        if timestamp is None:
+            entry = parse_entry(line)
+            if entry is None:
+                continue
+            timestamp = int(entry[0])
+
+        running_max = max(running_max, timestamp)
+        block_min = min(block_min, timestamp)
+        open_lines += 1
+
+        if open_lines == INDEX_STRIDE:
+            index[-1] = block_min
+            index.extend((offset, running_max, TS_MAX))
+            block_min = TS_MAX
+            open_lines = 0
+
+    if end == index[1]:
+        return index
+
+    index[-1] = block_min
+    with open(path, 'rb') as f:
+        crc = _tail_crc(f, end)
+    index[1:INDEX_HEADER] = array('q', [end, crc, running_max, open_lines])
+
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    tmp_path = sidecar + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        index.tofile(f)
+    os.replace(tmp_path, sidecar)
+
+    return index
+
+
+def seek_range(index: array, cutoff_ts: float = None,
+               cutoff_end_ts: float = None) -> tuple:
+    """
+    Find the byte range of a history file that can hold a time window.
+
+    Returns:
+        (start, stop) offsets, stop being None to read to the end
+    """
+    offsets = index[INDEX_HEADER::3]
+    max_before = index[INDEX_HEADER + 1::3]
+    block_min = index[INDEX_HEADER + 2::3]
+
+    # Last block whose preceding lines are all older than the window
+    first = 0
+    if cutoff_ts:
+        first = max(0, bisect_left(max_before, cutoff_ts) - 1)
+
+    # First block from which every remaining line is past the window
+    stop = None
+    if cutoff_end_ts:
+        suffix_min = TS_MAX
+        for i in range(len(offsets) - 1, first, -1):
+            suffix_min = min(suffix_min, block_min[i])
+            if suffix_min < cutoff_end_ts:
+                break
+            stop = offsets[i]
+
+    return offsets[first], stop
+
+
+def make_prompt(
+    display: str,
+    timestamp: int,
+    proj: str,
+    has_paste: bool,
+    project: str = None,
+    skip_commands: bool = True
+) -> Prompt:
+    """
+    Build a Prompt from raw history fields, or None if it is filtered out.
+
+    Args:
+        display: Raw display text
+        timestamp: Epoch millis
+        proj: Project the prompt was sent from
+        has_paste: Whether pasted content was present
+        project: Filter by project name (partial match)
+        skip_commands: Skip slash commands and system messages
+    """
+    # Skip commands
+    if skip_commands and is_command(display):
+        return None
+
+    # Filter by project
+    if project and project.lower() not in proj.lower():
+        return None
+
+    # Strip paste markers
+    clean_text = strip_paste_markers(display)
+
+    # Skip empty prompts
+    if not clean_text:
+        return None
+
+    return Prompt(
+        text=clean_text,
+        timestamp=datetime.fromtimestamp(timestamp / 1000),
+        project=proj,
+        has_paste=has_paste,
+        raw_display=display
+    )
+
+
+def _read_range(path: str, start: int, stop: int, cutoff_ts: float,
+                cutoff_end_ts: float, project: str, skip_commands: bool) -> Iterator[Prompt]:
+    """Read and filter the prompts in one byte range of the history file."""
+    for _, (timestamp, proj, display, has_paste) in iter_entries(
+            path, start, stop, cutoff_ts, cutoff_end_ts):
+        # Skip if before cutoff
+        if cutoff_ts and timestamp < cutoff_ts:
+            continue
+
+        # Skip if after end cutoff (for yesterday_only)
+        if cutoff_end_ts and timestamp >= cutoff_end_ts:
+            continue
+
+        prompt = make_prompt(display, timestamp, proj, has_paste,
+                             project=project, skip_commands=skip_commands)
+        if prompt is not None:
+            yield prompt
+
+
+def in_order(items: Iterator[tuple], window: int = REORDER_WINDOW) -> Iterator[tuple]:
+    """
+    Put (timestamp, ...) items that are only slightly out of order back in order.
+
+    Sessions running side by side can write their lines a little out of
+    order, so items pass through a heap of the last window ones. Anything
+    later than that still comes out late.
+    """
+    heap = []
+    for n, item in enumerate(items):
+        # n breaks timestamp ties, so the items themselves are never compared
+        if len(heap) < window:
+            heapq.heappush(heap, (item[0], n, item))
+        else:
+            yield heapq.heappushpop(heap, (item[0], n, item))[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def dedup(items: Iterator[tuple], late: list, last: tuple = None) -> Iterator[tuple]:
+    """
+    Drop repeats of the same prompt from timestamp-ordered (timestamp, Prompt, ...) items.
+
+    Copies of a prompt (e.g. in a live file and its archive) share a
+    timestamp, so only hashes for the current timestamp are kept; last
+    seeds them as (timestamp, hashes) of whatever came before. Items older
+    than the current timestamp can't be checked, so they go into late.
+
+    Yields:
+        The items with the prompt's hash added on the end
+    """
+    import storage
+
+    current, seen = last or (None, ())
+    seen = set(seen)
+    for item in items:
+        timestamp, prompt = item[0], item[1]
+        if current is not None and timestamp < current:
+            late.append(item)
+            continue
+        if timestamp != current:
+            current = timestamp
+            seen = set()
+        key = storage.hash_prompt(prompt.text, prompt.timestamp)
+        if key not in seen:
+            seen.add(key)
+            yield (*item, key)
+
+
+def merge_sources(streams: list, late: list, last: tuple = None) -> Iterator[tuple]:
+    """
+    Heap-merge timestamp-ordered (timestamp, Prompt, ...) streams, without repeats.
+
+    Each stream is read lazily, so memory holds one read buffer per source
+    rather than the sources themselves. late and last are as for dedup.
+    """
+    return dedup(heapq.merge(*streams, key=itemgetter(0)), late, last)
+
+
 def read_history(
     limit: int = None,
     days: int = None,
@@ -61,71 +499,81 @@ def read_history(
     Yields:
         Prompt objects
     """
+    cutoff_ts, cutoff_end_ts = time_window(days, today_only, yesterday_only)
+
     if not os.path.exists(HISTORY_PATH):
         return
 
-    cutoff_ts = None
-    cutoff_end_ts = None
+    # Jump straight to the window instead of scanning from the top
+    start, stop = 0, None
+    if cutoff_ts or cutoff_end_ts:
+        start, stop = seek_range(load_index(HISTORY_PATH), cutoff_ts, cutoff_end_ts)
 
-    if today_only:
-        # Midnight today
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        cutoff_ts = today_start.timestamp() * 1000
-    elif yesterday_only:
-        # Yesterday midnight to today midnight
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        yesterday_start = today_start - timedelta(days=1)
-        cutoff_ts = yesterday_start.timestamp() * 1000
-        cutoff_end_ts = today_start.timestamp() * 1000
-    elif days:
-        cutoff_ts = (datetime.now().timestamp() - days * 86400) * 1000
+    prompts = _read_range(HISTORY_PATH, start, stop, cutoff_ts, cutoff_end_ts,
+                          project, skip_commands)
+    yield from islice(prompts, limit)
 
-    count = 0
-    with open(HISTORY_PATH, 'r') as f:
-        for line in f:
-            if limit and count >= limit:
-                break
 
-            try:
-                entry = json.loads(line)
-            except json.JSONDecodeError:
-                continue
+def read_history_reverse(
+    limit: int = None,
+    cutoff_ts: float = None,
+    project: str = None,
+    skip_commands: bool = True,
+    path: str = None
+) -> Iterator[Prompt]:
+    """
+    Read prompts newest-first from the end of the history file.
 
-            display = entry.get('display', '')
-            timestamp = entry.get('timestamp', 0)
-            proj = entry.get('project', '')
-            pasted = entry.get('pastedContents', {})
+    Stops at the first entry older than cutoff_ts, so cost depends on how
+    far back the caller looks rather than on the size of the file.
 
-            # Skip if before cutoff
-            if cutoff_ts and timestamp < cutoff_ts:
-                continue
+    Args:
+        limit: Max number of prompts to return
+        cutoff_ts: Stop once entries are older than this epoch millis
+        project: Filter by project name (partial match)
+        skip_commands: Skip slash commands and system messages
+        path: History file to read (default: HISTORY_PATH)
 
-            # Skip if after end cutoff (for yesterday_only)
-            if cutoff_end_ts and timestamp >= cutoff_end_ts:
-                continue
+    Yields:
+        Prompt objects, newest first
+    """
+    path = path or HISTORY_PATH
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
 
-            # Skip commands
-            if skip_commands and is_command(display):
-                continue
+    count = 0
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # A trailing line without a newline is still being written
+        end = mm.rfind(b'\n') + 1
+
+        while end > 0:
+            if limit and count >= limit:
+                break
 
-            # Filter by project
-            if project and project.lower() not in proj.lower():
+            start = mm.rfind(b'\n', 0, end - 1) + 1
+            line = mm[start:end]
+            end = start
+
+            # Stop on the timestamp alone before paying for a decode
+            timestamp = peek_timestamp(line)
+            if cutoff_ts and timestamp is not None and timestamp < cutoff_ts:
+                break
+
+            entry = parse_entry(line)
+            if entry is None:
                 continue
 
-            # Strip paste markers
-            clean_text = strip_paste_markers(display)
+            timestamp, proj, display, has_paste = entry
+            if cutoff_ts and timestamp < cutoff_ts:
+                break
 
-            # Skip empty prompts
-            if not clean_text:
+            prompt = make_prompt(display, timestamp, proj, has_paste,
+                                 project=project, skip_commands=skip_commands)
+            if prompt is None:
                 continue
 
-            yield Prompt(
-                text=clean_text,
-                timestamp=datetime.fromtimestamp(timestamp / 1000),
-                project=proj,
-                has_paste=bool(pasted),
-                raw_display=display
-            )
+            yield prompt
             count += 1
 
 
@@ -0,0 +1,145 @@
+"""
+History sources - which files prompts are read from.
+
+By default that is ~/.claude/history.jsonl plus any monthly segments
+archive.compact copied out of it. Teams on several machines can list
+more: rotated or gzip-compressed copies, and directories of per-host
+exports.
+"""
+
+import json
+import os
+import re
+
+HISTORY_PATH = os.path.expanduser("~/.claude/history.jsonl")
+
+# Compressed monthly segments of archived history, see archive.compact
+ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'archive')
+
+# How far into each history file its lines are archived, see archived_offsets
+WATERMARKS_PATH = os.path.join(ARCHIVE_DIR, 'watermarks.json')
+
+# Bytes before an offset that must still match for a file to be unchanged up to it
+FINGERPRINT_SIZE = 64
+
+# First line of a segment: {"segment": {"start": ms, "end": ms, "count": n}}
+SEGMENT_KEY = b'{"segment":'
+
+# Sources to read instead of HISTORY_PATH, os.pathsep-separated
+SOURCES_ENV = 'FATIGUE_HISTORY'
+
+# History files, rotated copies and gzip archives found in a source directory
+SOURCE_PATTERN = re.compile(r'.*\.jsonl(\.\d+)?(\.gz)?$')
+
+
+def default_sources() -> list[str]:
+    """Get the sources named in $FATIGUE_HISTORY (or HISTORY_PATH), plus the archive."""
+    value = os.environ.get(SOURCES_ENV)
+    if not value:
+        return [HISTORY_PATH, ARCHIVE_DIR]
+    return [os.path.expanduser(s) for s in value.split(os.pathsep) if s] + [ARCHIVE_DIR]
+
+
+def resolve_sources(sources: list[str] = None) -> list[str]:
+    """
+    Expand history sources to the files they stand for.
+
+    A source is a history file, a rotated or gzip-compressed copy of one,
+    or a directory of them (e.g. one export per machine). Missing sources
+    are skipped.
+
+    Returns:
+        Sorted, de-duplicated absolute file paths
+    """
+    paths = set()
+    for source in sources or default_sources():
+        if os.path.isdir(source):
+            for name in os.listdir(source):
+                path = os.path.join(source, name)
+                if SOURCE_PATTERN.match(name) and os.path.isfile(path):
+                    paths.add(os.path.realpath(path))
+        elif os.path.isfile(source):
+            paths.add(os.path.realpath(source))
+    return sorted(paths)
+
+
+def is_archive(path: str) -> bool:
+    """Check if a history source is gzip-compressed."""
+    return path.endswith('.gz')
+
+
+def open_source(path: str):
+    """Open a history source for binary reading, decompressing archives."""
+    if is_archive(path):
+        import gzip
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def segment_range(path: str) -> tuple:
+    """Get (start, end) epoch millis from a segment's header, or None if it has none."""
+    if not is_archive(path):
+        return None
+    with open_source(path) as f:
+        line = f.readline()
+    if not line.startswith(SEGMENT_KEY):
+        return None
+    header = json.loads(line)['segment']
+    return header['start'], header['end']
+
+
+def overlaps(path: str, cutoff_ts: float = None, cutoff_end_ts: float = None) -> bool:
+    """Check if a file can hold entries in [cutoff_ts, cutoff_end_ts)."""
+    span = segment_range(path)
+    if span is None:
+        return True
+    start, end = span
+    return (not cutoff_ts or end >= cutoff_ts) and (not cutoff_end_ts or start < cutoff_end_ts)
+
+
+
+def read_fingerprint(path: str, offset: int) -> bytes:
+    """Read the bytes just before offset."""
+    start = max(0, offset - FINGERPRINT_SIZE)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f.read(offset - start)
+
+
+def load_watermarks() -> dict:
+    """Get the stored watermarks: path -> {'inode', 'offset', 'fingerprint' (hex)}."""
+    if not os.path.exists(WATERMARKS_PATH):
+        return {}
+    with open(WATERMARKS_PATH) as f:
+        return json.load(f)
+
+
+def archived_offset(path: str) -> int:
+    """Get the offset path is archived up to, or 0 if it no longer holds those lines unchanged."""
+    mark = load_watermarks().get(path)
+    if mark is None:
+        return 0
+    st = os.stat(path)
+    if (st.st_ino != mark['inode'] or st.st_size < mark['offset']
+            or read_fingerprint(path, mark['offset']).hex() != mark['fingerprint']):
+        return 0
+    return mark['offset']
+
+
+def archived_offsets(paths: list[str]) -> dict:
+    """
+    Get where reading each file can start, past the lines already archived.
+
+    Only applies when the archive is among paths, as otherwise the
+    archived lines would be missed.
+
+    Args:
+        paths: Files being read, as from resolve_sources
+
+    Returns:
+        Dict of path -> byte offset, for the files with an archived prefix
+    """
+    archive = os.path.realpath(ARCHIVE_DIR)
+    if not any(os.path.dirname(path) == archive for path in paths):
+        return {}
+    return {path: archived_offset(path) for path in paths if not is_archive(path)}
@@ -0,0 +1,154 @@
+"""
+Incremental reads of the history sources, checkpointed in the SQLite store.
+
+History files only grow, so each run parses just the bytes appended since
+the last checkpoint instead of decoding every file again. The snapshot
+merges what is read, and checkpoints are only saved once it has.
+"""
+
+import os
+
+import history_sources
+import storage
+import timings
+
+
+def plan(sources: list[str] = None, rebuild: bool = False, cutoff_ts: float = None) -> tuple:
+    """
+    Work out where each history source has to be read from.
+
+    An added source is read from the start, past the lines archive.compact
+    copied into the archive when that is among the sources. A grown file is
+    read on from its checkpoint, and an unchanged one not at all. Archives
+    are read whole when they change; the lines already merged drop out as
+    repeats. If a plain file was truncated, replaced or rewritten in place,
+    or a source went away, everything is read again.
+
+    Archived segments whose header says they end before cutoff_ts are left
+    unread, until a caller reaching back that far reads them as added.
+
+    Args:
+        sources: History sources as for history_sources.resolve_sources
+            (default: $FATIGUE_HISTORY, or history.HISTORY_PATH)
+        rebuild: Read everything again regardless
+        cutoff_ts: Epoch millis the caller needs prompts from
+
+    Returns:
+        (rebuild, {path: byte offset to read from}) for the sources to read
+    """
+    paths = [p for p in history_sources.resolve_sources(sources) if os.path.exists(p)]
+    states = storage.get_ingest_states()
+    rebuild = (rebuild
+               or not set(states) <= set(paths)
+               or any(p in states and _needs_rescan(p, states[p]) for p in paths))
+    if rebuild:
+        states = {}
+
+    archived = history_sources.archived_offsets(paths)
+    starts = {}
+    for p in paths:
+        state = states.get(p)
+        if state is None:
+            start = archived.get(p, 0)
+        else:
+            st = os.stat(p)
+            if (st.st_ino, st.st_size) == (state['inode'], state['size']):
+                continue
+            start = 0 if history_sources.is_archive(p) else state['offset']
+        if history_sources.overlaps(p, cutoff_ts):
+            starts[p] = start
+    return rebuild, starts
+
+
+def _needs_rescan(path: str, state: dict) -> bool:
+    """Check if a plain file no longer continues from its checkpoint."""
+    if history_sources.is_archive(path):
+        return False
+    st = os.stat(path)
+    return (
+        state['inode'] != st.st_ino
+        or st.st_size < state['offset']
+        or history_sources.read_fingerprint(path, state['offset']) != state['fingerprint']
+    )
+
+
+def read(starts: dict, workers: int = 1) -> tuple:
+    """
+    Start reading history sources from the offsets plan gave.
+
+    With workers other than 1 (0 = one per CPU), a plain file read that
+    spans several history.PARALLEL_RANGE_SIZE ranges is split across a
+    process pool, each worker parsing, filtering and scoring its own range.
+
+    Returns:
+        (streams, checkpoints): one stream of (timestamp, Prompt, score)
+        items per source, put in order by history.in_order, and the
+        checkpoints for save, filled in as each stream runs out. score is
+        (total, category) if a worker already scored the prompt, else None.
+    """
+    import history
+
+    workers = workers or os.cpu_count() or 1
+    checkpoints = {}
+    streams = [history.in_order(_read_source(path, start, workers, checkpoints))
+               for path, start in starts.items()]
+    return streams, checkpoints
+
+
+def _read_source(path: str, start: int, workers: int, checkpoints: dict):
+    """Stream one source's items from start, then record its checkpoint."""
+    import history
+
+    st = os.stat(path)
+    ranges = []
+    if workers != 1 and not history_sources.is_archive(path):
+        ranges = history.split_ranges(path, start)
+
+    offset = start
+    if len(ranges) > 1:
+        from multiprocessing import Pool
+        tasks = [(path, a, b) for a, b in ranges]
+        with Pool(workers, timings.init_worker, (timings.enabled,)) as pool:
+            # Ranges come back in file order, so offset only moves forward
+            for items, end, counts in pool.imap(_read_range, tasks):
+                timings.add_counts(counts)
+                offset = max(offset, end)
+                yield from items
+    else:
+        for offset, (timestamp, proj, display, has_paste) in history.iter_entries(path, start):
+            prompt = history.make_prompt(display, timestamp, proj, has_paste)
+            if prompt is not None:
+                yield timestamp, prompt, None
+
+    # Archive checkpoints are in compressed bytes, to match os.stat
+    if history_sources.is_archive(path):
+        offset = st.st_size
+    checkpoints[path] = (st.st_ino, st.st_size, offset,
+                         history_sources.read_fingerprint(path, offset))
+
+
+def _read_range(task: tuple) -> tuple:
+    """
+    Pool worker: parse, filter and score one range of a history file.
+
+    Returns:
+        (items, end_offset, counters), items as from read
+    """
+    import analyzer
+    import history
+
+    path, start, stop = task
+    items = []
+    offset = start
+    for offset, (timestamp, proj, display, has_paste) in history.iter_entries(path, start, stop):
+        prompt = history.make_prompt(display, timestamp, proj, has_paste)
+        if prompt is not None:
+            total, category, _ = analyzer.compact_score(prompt.text)
+            items.append((timestamp, prompt, (total, category)))
+    timings.count('prompts scored', len(items))
+    return items, offset, timings.take_counts()
+
+
+def save(checkpoints: dict, rebuild: bool = False):
+    """Store the checkpoints of a read once its prompts are merged."""
+    storage.save_ingest_states(checkpoints, reset=rebuild)
@@ -0,0 +1,299 @@
+"""
+Per-prompt fatigue features and the metrics built from them.
+
+Each prompt is measured and scored once into a PromptFeatures record;
+every report section reads those records instead of rescanning the text.
+"""
+
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+@dataclass
+class PromptFeatures:
+    """Everything the reports need to know about one prompt."""
+    timestamp: datetime
+    score: float           # 1-10 quality score
+    category: str          # Quality category
+    length: int            # Characters
+    words: int
+    is_grunt: bool         # Very short or lazy reply
+    specificity: int       # File refs, inline code, @mentions
+
+
+# Very short or lazy replies
+GRUNT_PATTERNS = frozenset([
+    'yes', 'no', 'ok', 'okay', 'sure', 'continue', 'go',
+    'do it', 'good', 'great', 'nice', 'thanks', 'let\'s do it',
+    'let\'s go', 'sounds good'
+])
+
+# Specificity signals (file refs, code, @mentions)
+FILE_REF_PATTERN = re.compile(r'\b\w+\.(py|js|ts|tsx|go|rs|java|cpp)\b', re.I)
+INLINE_CODE_PATTERN = re.compile(r'`[^`]+`')
+MENTION_PATTERN = re.compile(r'@\w+')
+
+# Bucket widths in seconds
+GRANULARITIES = {
+    '15m': 15 * 60,
+    'hour': 60 * 60,
+    'day': 24 * 60 * 60,
+    'week': 7 * 24 * 60 * 60,
+}
+
+# The epoch fell on a Thursday; shift so weeks start on Monday
+WEEK_SHIFT = 3 * 24 * 60 * 60
+
+# Columns summed per bucket, in Aggregate.add order
+SUM_COLUMNS = ('length', 'words', 'grunt', 'specificity', 'score')
+
+# Below this many rows plain Python beats importing NumPy
+NUMPY_MIN_ROWS = 5000
+
+
+def is_grunt(text: str) -> bool:
+    """Check if text is a very short or lazy reply."""
+    return len(text) < 15 or text.lower().strip().rstrip('.!') in GRUNT_PATTERNS
+
+
+def count_specificity(text: str) -> int:
+    """Count file refs, inline code and @mentions."""
+    return (len(FILE_REF_PATTERN.findall(text))
+            + len(INLINE_CODE_PATTERN.findall(text))
+            + len(MENTION_PATTERN.findall(text)))
+
+
+def measure(text: str) -> tuple:
+    """Get (length, words, is_grunt, specificity) for a prompt's text."""
+    return len(text), len(text.split()), is_grunt(text), count_specificity(text)
+
+
+def extract_features(prompt, score: float, category: str) -> PromptFeatures:
+    """Measure a history.Prompt that has already been scored."""
+    length, words, grunt, specificity = measure(prompt.text)
+    return PromptFeatures(
+        timestamp=prompt.timestamp,
+        score=score,
+        category=category,
+        length=length,
+        words=words,
+        is_grunt=grunt,
+        specificity=specificity
+    )
+
+
+class Aggregate:
+    """Running sums behind the fatigue metrics of a group of prompts."""
+
+    __slots__ = ('count', 'length', 'words', 'grunts', 'specificity', 'score')
+
+    def __init__(self):
+        self.count = 0
+        self.length = 0
+        self.words = 0
+        self.grunts = 0
+        self.specificity = 0
+        self.score = 0
+
+    def add(self, length: int, words: int, grunt: bool, specificity: int,
+            score: float = 0):
+        """Add one prompt's measurements."""
+        self.count += 1
+        self.length += length
+        self.words += words
+        self.grunts += grunt
+        self.specificity += specificity
+        self.score += score
+
+    def merge(self, other: 'Aggregate'):
+        """Add another group's sums into this one."""
+        self.count += other.count
+        self.length += other.length
+        self.words += other.words
+        self.grunts += other.grunts
+        self.specificity += other.specificity
+        self.score += other.score
+
+    def sums(self) -> tuple:
+        """Get (count, length, words, grunts, specificity, score)."""
+        return self.count, self.length, self.words, self.grunts, self.specificity, self.score
+
+    @classmethod
+    def from_sums(cls, sums) -> 'Aggregate':
+        """Rebuild an Aggregate from sums()."""
+        agg = cls()
+        (agg.count, agg.length, agg.words, agg.grunts,
+         agg.specificity, agg.score) = sums
+        return agg
+
+    def metrics(self):
+        """Get the group's average fatigue signals, or None if empty."""
+        if not self.count:
+            return None
+
+        n = self.count
+        return {
+            'avg_length': self.length / n,
+            'avg_words': self.words / n,
+            'grunt_ratio': self.grunts / n,
+            'specificity_per_prompt': self.specificity / n,
+            'avg_score': self.score / n,
+            'total_prompts': n
+        }
+
+
+def fatigue_index(m: dict) -> float:
+    """
+    Turn fatigue metrics into a 0-100 fatigue index (higher = more fatigued).
+
+    Based on: lower length, higher grunt ratio, lower specificity
+    """
+    # Normalize each component to 0-100 fatigue scale
+    length_fatigue = max(0, min(100, 100 - (m['avg_length'] / 2)))  # <50 chars = high fatigue
+    grunt_fatigue = m['grunt_ratio'] * 100  # More grunts = more fatigue
+    specificity_fatigue = max(0, min(100, 100 - (m['specificity_per_prompt'] * 50)))  # Less specific = more fatigue
+
+    # Weighted average
+    return (length_fatigue * 0.4) + (grunt_fatigue * 0.4) + (specificity_fatigue * 0.2)
+
+
+def _numpy(rows: int):
+    """Get NumPy if it is installed and worth importing for rows, else None."""
+    if rows < NUMPY_MIN_ROWS:
+        return None
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _utc_offset(seconds: int) -> int:
+    """Get the local UTC offset in seconds at an epoch time."""
+    return time.localtime(seconds).tm_gmtoff
+
+
+def _hour_offset(hour: int) -> int:
+    """
+    Get the local UTC offset for a whole epoch hour, or None if it changes
+    within the hour.
+
+    Offsets usually change on the hour, but not in half-hour or 45-minute
+    zones (Lord Howe's DST is 30 minutes, and India, Nepal or Adelaide are
+    off the hour from UTC), so both ends are checked.
+    """
+    offset = _utc_offset(hour * 3600)
+    return offset if _utc_offset(hour * 3600 + 3599) == offset else None
+
+
+def bucket_keys(timestamps, granularity: str):
+    """
+    Map epoch millis to bucket numbers on the local clock.
+
+    UTC offsets are looked up once per distinct hour; only timestamps in
+    an hour where the offset changes are looked up one by one.
+    """
+    width = GRANULARITIES[granularity]
+    shift = WEEK_SHIFT if granularity == 'week' else 0
+
+    np = _numpy(len(timestamps))
+    if np is not None:
+        ts = np.asarray(timestamps, dtype=np.int64)
+        hours, inverse = np.unique(ts // 3600000, return_inverse=True)
+        hour_offsets = [_hour_offset(h) for h in hours.tolist()]
+        offsets = np.array([0 if o is None else o for o in hour_offsets],
+                           dtype=np.int64)[inverse]
+        for i, h in enumerate(hour_offsets):
+            if h is None:
+                rows = np.flatnonzero(inverse == i)
+                offsets[rows] = [_utc_offset(t) for t in (ts[rows] // 1000).tolist()]
+        return (ts // 1000 + offsets + shift) // width
+
+    offsets = {}
+    keys = []
+    for ts in timestamps:
+        seconds = int(ts) // 1000
+        hour = seconds // 3600
+        if hour not in offsets:
+            offsets[hour] = _hour_offset(hour)
+        offset = offsets[hour]
+        if offset is None:
+            offset = _utc_offset(seconds)
+        keys.append((seconds + offset + shift) // width)
+    return keys
+
+
+def bucket_start(key: int, granularity: str) -> datetime:
+    """Get the local time a bucket from bucket_keys starts at."""
+    shift = WEEK_SHIFT if granularity == 'week' else 0
+    return datetime(1970, 1, 1) + timedelta(seconds=key * GRANULARITIES[granularity] - shift)
+
+
+def bucket_aggregates(columns: dict, granularity: str = None) -> dict:
+    """
+    Sum every time bucket's fatigue signals in one pass.
+
+    Args:
+        columns: Per-prompt sequences keyed 'timestamp' (epoch millis),
+            'length', 'words', 'grunt', 'specificity' and 'score', e.g.
+            from snapshot.Snapshot.column_values
+        granularity: A GRANULARITIES key, or None for a single bucket 0
+
+    Returns:
+        Dict of bucket number -> Aggregate
+    """
+    n = len(columns['length'])
+    if not n:
+        return {}
+
+    keys = bucket_keys(columns['timestamp'], granularity) if granularity else [0] * n
+
+    np = _numpy(n)
+    if np is not None:
+        buckets, inverse = np.unique(np.asarray(keys), return_inverse=True)
+        counts = np.bincount(inverse)
+        sums = [np.bincount(inverse, weights=np.asarray(columns[name], dtype=np.float64))
+                for name in SUM_COLUMNS]
+
+        aggregates = {}
+        for i, key in enumerate(buckets.tolist()):
+            agg = aggregates[key] = Aggregate()
+            agg.count = int(counts[i])
+            agg.length, agg.words, agg.grunts, agg.specificity, agg.score = (
+                s[i].item() for s in sums)
+    else:
+        aggregates = defaultdict(Aggregate)
+        for key, *values in zip(keys, *(columns[name] for name in SUM_COLUMNS)):
+            aggregates[key].add(*values)
+
+    return aggregates
+
+
+def summarize(aggregates: dict) -> dict:
+    """Turn key -> Aggregate into key -> metrics dict plus 'fatigue', in key order."""
+    result = {}
+    for key in sorted(aggregates):
+        m = aggregates[key].metrics()
+        m['fatigue'] = fatigue_index(m)
+        result[key] = m
+    return result
+
+
+def merge_all(aggregates) -> Aggregate:
+    """Sum several Aggregates into one."""
+    total = Aggregate()
+    for agg in aggregates:
+        total.merge(agg)
+    return total
+
+
+def hour_of_day_aggregates(columns: dict) -> dict:
+    """Sum fatigue signals by local hour of day (0-23)."""
+    hours = {}
+    for key, agg in bucket_aggregates(columns, 'hour').items():
+        hours.setdefault(bucket_start(key, 'hour').hour, Aggregate()).merge(agg)
+    return hours
+
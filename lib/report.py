@@ -2,10 +2,75 @@
 Report generation with ASCII charts and visualizations.
 """
 
+import heapq
 import json
 from collections import Counter, defaultdict
 from datetime import datetime
 
+# Score ranges of each quality category
+CATEGORY_RANGES = {
+    'grunt': (1, 2),
+    'minimal': (3, 4),
+    'adequate': (5, 6),
+    'solid': (7, 8),
+    'excellent': (9, 10)
+}
+
+
+class ScoreSummary:
+    """
+    One-pass summary of a stream of scored prompts.
+
+    Keeps the k worst and k best prompts in bounded heaps plus a histogram
+    of score values for the median and distribution, so memory depends on
+    k rather than on how many prompts are fed. Ties go to the prompt fed
+    first, i.e. the oldest.
+    """
+
+    def __init__(self, k: int = 5):
+        self.k = k
+        self.count = 0
+        self.total = 0.0
+        self.histogram = Counter()
+        self._worst = []    # Max-heap of (-score, -seq, item)
+        self._best = []     # Min-heap of (score, -seq, item)
+
+    def add(self, score: float, item):
+        """Feed one prompt; item is whatever identifies it (text, row, ...)."""
+        seq = self.count
+        self.count += 1
+        self.total += score
+        self.histogram[score] += 1
+
+        if len(self._worst) < self.k:
+            heapq.heappush(self._worst, (-score, -seq, item))
+        elif score < -self._worst[0][0]:
+            heapq.heapreplace(self._worst, (-score, -seq, item))
+
+        if len(self._best) < self.k:
+            heapq.heappush(self._best, (score, -seq, item))
+        elif score > self._best[0][0]:
+            heapq.heapreplace(self._best, (score, -seq, item))
+
+    def worst(self) -> list:
+        """Get (item, score) for the k lowest scores, worst first."""
+        return [(item, -neg) for neg, _, item in sorted(self._worst, reverse=True)]
+
+    def best(self) -> list:
+        """Get (item, score) for the k highest scores, best first."""
+        return [(item, score) for score, _, item in sorted(self._best, reverse=True)]
+
+    def mean(self) -> float:
+        return self.total / self.count
+
+    def median(self) -> float:
+        """Get the upper median, as sorted(scores)[len(scores) // 2]."""
+        remaining = self.count // 2
+        for score in sorted(self.histogram):
+            remaining -= self.histogram[score]
+            if remaining < 0:
+                return score
+
 
 def bar_chart(value: float, max_value: float, width: int = 16) -> str:
     """Create ASCII bar chart segment."""
@@ -26,45 +91,28 @@ def sparkline(values: list[float], width: int = 20) -> str:
     return ''.join(chars[int(n * 7)] for n in normalized[-width:])
 
 
-def format_distribution(scores: list[float]) -> dict:
-    """Calculate score distribution by category."""
-    categories = {
-        'grunt': (1, 2),
-        'minimal': (3, 4),
-        'adequate': (5, 6),
-        'solid': (7, 8),
-        'excellent': (9, 10)
-    }
-
-    total = len(scores)
+def format_distribution(histogram: Counter) -> dict:
+    """Calculate score distribution by category from score -> count."""
+    total = sum(histogram.values())
     if total == 0:
         return {}
 
     dist = {}
-    for name, (low, high) in categories.items():
-        count = sum(1 for s in scores if low <= s <= high)
+    for name, (low, high) in CATEGORY_RANGES.items():
+        count = sum(n for s, n in histogram.items() if low <= s <= high)
         pct = count / total * 100
         dist[name] = {'count': count, 'percent': pct}
 
     return dist
 
 
-def format_hall_of_shame(prompts_with_scores: list, limit: int = 5) -> list:
-    """Get worst prompts."""
-    sorted_prompts = sorted(prompts_with_scores, key=lambda x: x[1])
-    return [(p, s) for p, s in sorted_prompts[:limit]]
-
-
-def format_hall_of_fame(prompts_with_scores: list, limit: int = 5) -> list:
-    """Get best prompts."""
-    sorted_prompts = sorted(prompts_with_scores, key=lambda x: x[1], reverse=True)
-    return [(p, s) for p, s in sorted_prompts[:limit]]
-
-
-def format_stamina_heatmap(hourly_stats: dict, dow_stats: dict) -> str:
+def format_stamina_heatmap(matrix: list[list[dict]]) -> str:
     """
     Create GitHub-style heatmap showing activity/quality by hour and day.
 
+    Args:
+        matrix: 24 rows (hour) of 7 cells (0=Monday), each {'avg_score', 'count'}
+
     Returns ASCII heatmap string.
     """
     days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
@@ -78,24 +126,22 @@ def format_stamina_heatmap(hourly_stats: dict, dow_stats: dict) -> str:
 
     lines = [header]
 
-    # For now, just show hourly averages (we'd need hour+day combined stats for full heatmap)
     for hour in hours:
         row = f'{hour:02d}:00    '
-        stats = hourly_stats.get(hour, {})
-        avg = stats.get('avg_score', 0)
-        count = stats.get('count', 0)
-
-        if count == 0:
-            intensity = 0
-        elif avg <= 3:
-            intensity = 1
-        elif avg <= 6:
-            intensity = 2
-        else:
-            intensity = 3
-
-        # Repeat for each day (simplified - real version would need hour+day data)
-        row += '    '.join([chars[intensity]] * 7)
+        cells = []
+        for stats in matrix[hour]:
+            avg = stats['avg_score']
+            if stats['count'] == 0:
+                intensity = 0
+            elif avg <= 3:
+                intensity = 1
+            elif avg <= 6:
+                intensity = 2
+            else:
+                intensity = 3
+            cells.append(chars[intensity])
+
+        row += '    '.join(cells)
         lines.append(row)
 
     lines.append('')
@@ -134,10 +180,11 @@ def format_session_pattern(session_data: list[list[float]]) -> str:
 
 
 def generate_report(
-    scores: list[float],
-    prompts_with_scores: list,
+    summary: ScoreSummary,
+    text_of=None,
     hourly_stats: dict = None,
     dow_stats: dict = None,
+    stamina_matrix: list = None,
     weekly_trend: list = None,
     session_data: list = None,
     paste_count: int = 0,
@@ -152,20 +199,23 @@ def generate_report(
     """
     Generate comprehensive report data.
 
+    text_of turns the items fed to summary into prompt text; by default
+    the items are the text.
+
     Returns dict for JSON output that Claude will interpret.
     """
-    if not scores:
+    if not summary.count:
         return {'error': 'No prompts found', 'prompts_analyzed': 0}
 
-    avg_score = sum(scores) / len(scores)
-    distribution = format_distribution(scores)
+    text_of = text_of or str
+    distribution = format_distribution(summary.histogram)
 
     report = {
         'summary': {
-            'prompts_analyzed': len(scores),
+            'prompts_analyzed': summary.count,
             'time_period_days': days,
-            'average_score': round(avg_score, 1),
-            'median_score': round(sorted(scores)[len(scores)//2], 1),
+            'average_score': round(summary.mean(), 1),
+            'median_score': round(summary.median(), 1),
         },
         'distribution': distribution,
     }
@@ -179,7 +229,7 @@ def generate_report(
 
     # Hall of shame
     if show_shame:
-        shame = format_hall_of_shame(prompts_with_scores, 5)
+        shame = [(text_of(item), s) for item, s in summary.worst()]
         report['hall_of_shame'] = [
             {'text': p[:80] + ('...' if len(p) > 80 else ''), 'score': s}
             for p, s in shame
@@ -187,7 +237,7 @@ def generate_report(
 
     # Hall of fame
     if show_pride:
-        fame = format_hall_of_fame(prompts_with_scores, 5)
+        fame = [(text_of(item), s) for item, s in summary.best()]
         report['hall_of_fame'] = [
             {'text': p[:80] + ('...' if len(p) > 80 else ''), 'score': s}
             for p, s in fame
@@ -205,6 +255,12 @@ def generate_report(
                 day_names[d]: {'avg': round(s['avg_score'], 1), 'count': s['count']}
                 for d, s in dow_stats.items()
             }
+        if stamina_matrix:
+            # by_hour_day[hour][day], 0=Monday
+            report['stamina']['by_hour_day'] = [
+                [{'avg': round(s['avg_score'], 1), 'count': s['count']} for s in row]
+                for row in stamina_matrix
+            ]
 
     # Session pattern
     if show_session and session_data:
@@ -260,6 +316,14 @@ def format_ascii_report(report: dict) -> str:
             lines.append(f'  {cat:12s} {bar} {pct:4.0f}%')
         lines.append('')
 
+    # Stamina heatmap
+    if 'by_hour_day' in report.get('stamina', {}):
+        matrix = [[{'avg_score': c['avg'], 'count': c['count']} for c in row]
+                  for row in report['stamina']['by_hour_day']]
+        lines.append('Stamina (quality by hour and day):')
+        lines.append(format_stamina_heatmap(matrix))
+        lines.append('')
+
     # Hall of Shame
     if 'hall_of_shame' in report:
         lines.append('Hall of Shame:')
@@ -0,0 +1,79 @@
+"""
+Scoring with a persistent cache - each prompt is scored once per scorer version.
+"""
+
+import hashlib
+import os
+
+import metrics
+import storage
+import timings
+
+ANALYZER_PATH = os.path.join(os.path.dirname(__file__), 'analyzer.py')
+
+# Stamp stored next to cached scores. Derived from the analyzer's source so
+# any change to weights or patterns invalidates them without a manual bump,
+# and checkable without importing (and compiling) the analyzer itself.
+with open(ANALYZER_PATH, 'rb') as _f:
+    SCORER_VERSION = hashlib.sha256(_f.read()).hexdigest()[:12]
+
+
+def score_with_cache(prompts, workers=1, known=None):
+    """
+    Score prompts, reusing scores stored by the current scorer version.
+
+    Only prompts not seen before are scored, and only those are written
+    back for trend tracking.
+
+    Args:
+        known: (total, category), or None, per prompt, for prompts already
+            scored elsewhere (e.g. by a parallel read's workers); they are
+            stored like fresh scores but not scored again
+
+    Returns:
+        List of (total, category) tuples in prompt order
+    """
+    import analyzer
+
+    with timings.stage('score cache lookup'):
+        hashes = [storage.hash_prompt(p.text, p.timestamp) for p in prompts]
+        cached = storage.get_cached_scores(hashes, SCORER_VERSION,
+                                            [p.timestamp for p in prompts])
+
+    missing = [i for i, h in enumerate(hashes) if h not in cached]
+    scores = list(known) if known else [None] * len(prompts)
+    unscored = [i for i in missing if scores[i] is None]
+    timings.count('score cache hits', len(prompts) - len(missing))
+    timings.count('prompts scored', len(unscored))
+
+    with timings.stage('score (analyzer)'):
+        new_scores = analyzer.score_prompts((prompts[i].text for i in unscored),
+                                            workers=workers)
+    for i, (total, category, _) in zip(unscored, new_scores):
+        scores[i] = (total, category)
+
+    scores_to_store = []
+    for i in missing:
+        prompt = prompts[i]
+        total, category = cached[hashes[i]] = scores[i]
+        scores_to_store.append((
+            prompt.text,
+            total,
+            category,
+            prompt.timestamp,
+            prompt.project
+        ))
+
+    # Store scores for trend tracking
+    if scores_to_store:
+        with timings.stage('store scores'):
+            written = storage.store_scores_batch(scores_to_store, SCORER_VERSION)
+        timings.count('score rows written', written['inserted'] + written['updated'])
+
+    return [cached[h] for h in hashes]
+
+
+def build_features(prompts, workers=1, known=None):
+    """Score and measure every prompt once, for all report sections to share."""
+    return [metrics.extract_features(p, total, category)
+            for p, (total, category) in zip(prompts, score_with_cache(prompts, workers, known))]
@@ -0,0 +1,457 @@
+"""
+Columnar prompt snapshot - per-prompt numbers in memory-mapped column files.
+
+Each feature lives in its own append-only file of fixed-size values, and
+prompt text sits apart in a string heap. Reports that only need numbers
+read the columns straight off the mmap without any JSON parsing; only
+hall of shame/fame ever touch the heap.
+
+Files are never cut short under a reader: anything that is not a plain
+append is written as a new generation of files, switched to by replacing
+meta.json.
+"""
+
+import fcntl
+import json
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from itertools import chain
+from operator import itemgetter
+
+import metrics
+import scoring
+import storage
+import timings
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'snapshot')
+META_PATH = os.path.join(SNAPSHOT_DIR, 'meta.json')
+LOCK_PATH = os.path.join(SNAPSHOT_DIR, 'lock')
+
+# Column name -> array typecode
+COLUMNS = {
+    'timestamp': 'q',       # Epoch millis, ascending
+    'project': 'I',         # Index into meta['projects']
+    'length': 'I',
+    'words': 'I',
+    'grunt': 'B',
+    'specificity': 'I',
+    'score': 'd',
+    'category': 'B',        # Index into CATEGORIES
+    'paste': 'B',
+    'text_end': 'Q',        # End of the prompt's text in the heap
+}
+
+CATEGORIES = ['grunt', 'minimal', 'adequate', 'solid', 'excellent']
+
+
+class Snapshot:
+    """A read-only, memory-mapped view of the snapshot columns."""
+
+    def __init__(self, meta: dict):
+        self.meta = meta
+        self.count = meta['count']
+        self.projects = meta['projects']
+        generation = meta['generation']
+        self.columns = {name: _map(column_path(name, generation), code, self.count)
+                        for name, code in COLUMNS.items()}
+        self.heap = _map(heap_path(generation), 'B', meta['heap_size'])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def window(self, cutoff_ts: float = None, cutoff_end_ts: float = None) -> range:
+        """Get the rows inside a time window, as from history.time_window."""
+        timestamps = self.columns['timestamp']
+        lo = bisect_left(timestamps, cutoff_ts) if cutoff_ts else 0
+        hi = bisect_left(timestamps, cutoff_end_ts) if cutoff_end_ts else self.count
+        return range(lo, hi)
+
+    def select(self, rows, project: str = None, limit: int = None):
+        """
+        Narrow rows to a project (partial match) and the newest limit.
+
+        A window without a project filter stays a range.
+        """
+        if project:
+            wanted = {i for i, name in enumerate(self.projects)
+                      if project.lower() in name.lower()}
+            column = self.columns['project']
+            rows = [i for i in rows if column[i] in wanted]
+        if limit:
+            rows = rows[-limit:]
+        return rows
+
+    def features(self, rows) -> list[metrics.PromptFeatures]:
+        """Build feature records for rows without touching any text."""
+        c = self.columns
+        return [metrics.PromptFeatures(
+            timestamp=datetime.fromtimestamp(c['timestamp'][i] / 1000),
+            score=c['score'][i],
+            category=CATEGORIES[c['category'][i]],
+            length=c['length'][i],
+            words=c['words'][i],
+            is_grunt=bool(c['grunt'][i]),
+            specificity=c['specificity'][i]
+        ) for i in rows]
+
+    def column_values(self, rows) -> dict:
+        """Get every column's values for rows; a window stays zero-copy."""
+        if isinstance(rows, range) and rows.step == 1:
+            return {name: column[rows.start:rows.stop]
+                    for name, column in self.columns.items()}
+        return {name: [column[i] for i in rows]
+                for name, column in self.columns.items()}
+
+    def text(self, row: int) -> str:
+        """Get a prompt's text from the heap."""
+        ends = self.columns['text_end']
+        start = ends[row - 1] if row else 0
+        return bytes(self.heap[start:ends[row]]).decode()
+
+
+def column_path(name: str, generation: int) -> str:
+    """Get the file holding a column."""
+    return os.path.join(SNAPSHOT_DIR, f'{name}.{generation}.col')
+
+
+def heap_path(generation: int) -> str:
+    """Get the file holding the text heap."""
+    return os.path.join(SNAPSHOT_DIR, f'text.{generation}.bin')
+
+
+def _paths(generation: int) -> list[str]:
+    """Get every column file and the heap of a generation."""
+    return [column_path(name, generation) for name in COLUMNS] + [heap_path(generation)]
+
+
+def _map(path: str, typecode: str, count: int) -> memoryview:
+    """Memory-map the first count values of a column file."""
+    size = count * array(typecode).itemsize
+    if size == 0:
+        return memoryview(array(typecode))
+
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+    return memoryview(mm).cast(typecode)
+
+
+def _empty_meta(generation: int) -> dict:
+    return {
+        'generation': generation,
+        'columns': list(COLUMNS),
+        'scorer_version': scoring.SCORER_VERSION,
+        'last_ts': 0,
+        'last_hashes': [],
+        'count': 0,
+        'heap_size': 0,
+        'projects': [],
+    }
+
+
+def _truncate(meta: dict):
+    """Drop anything written past the last committed meta (e.g. a crash)."""
+    for name, code in COLUMNS.items():
+        with open(column_path(name, meta['generation']), 'ab') as f:
+            f.truncate(meta['count'] * array(code).itemsize)
+    with open(heap_path(meta['generation']), 'ab') as f:
+        f.truncate(meta['heap_size'])
+
+
+def _append(meta: dict, items: list, workers: int):
+    """
+    Measure, score and append a batch of items to the column files.
+
+    Items are (timestamp, Prompt, score, hash), score being (total,
+    category) when already known or None.
+    """
+    features = scoring.build_features([item[1] for item in items], workers,
+                                      [item[2] for item in items])
+
+    project_ids = {name: i for i, name in enumerate(meta['projects'])}
+    columns = {name: array(code) for name, code in COLUMNS.items()}
+    heap = bytearray()
+    heap_size = meta['heap_size']
+
+    # Hashes of the newest timestamp's prompts, so repeats arriving later drop out
+    last_ts = meta['last_ts']
+    hashes = set(meta['last_hashes'])
+
+    for (timestamp, prompt, _, key), f in zip(items, features):
+        if prompt.project not in project_ids:
+            project_ids[prompt.project] = len(meta['projects'])
+            meta['projects'].append(prompt.project)
+
+        text = prompt.text.encode()
+        heap += text
+        heap_size += len(text)
+
+        columns['timestamp'].append(int(timestamp))
+        columns['project'].append(project_ids[prompt.project])
+        columns['length'].append(f.length)
+        columns['words'].append(f.words)
+        columns['grunt'].append(f.is_grunt)
+        columns['specificity'].append(f.specificity)
+        columns['score'].append(f.score)
+        columns['category'].append(CATEGORIES.index(f.category))
+        columns['paste'].append(prompt.has_paste)
+        columns['text_end'].append(heap_size)
+
+        if timestamp != last_ts:
+            last_ts = timestamp
+            hashes = set()
+        hashes.add(key)
+
+    for name in COLUMNS:
+        with open(column_path(name, meta['generation']), 'ab') as f:
+            columns[name].tofile(f)
+    with open(heap_path(meta['generation']), 'ab') as f:
+        f.write(heap)
+
+    meta['count'] += len(items)
+    meta['heap_size'] = heap_size
+    meta['last_ts'] = last_ts
+    meta['last_hashes'] = sorted(hashes)
+
+
+def _append_all(meta: dict, items, workers: int):
+    """Append items in batches big enough for the scoring pool to kick in."""
+    size = storage.BATCH_SIZE * (workers or os.cpu_count() or 1)
+    with timings.stage('snapshot append'):
+        for batch in storage.chunked(items, size):
+            _append(meta, batch, workers)
+
+
+def _save_meta(meta: dict):
+    """Commit meta.json, and with it everything appended so far."""
+    tmp_path = META_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, META_PATH)
+
+
+def _rewrite(old: dict, keep: int, streams: list, late: list, workers: int) -> dict:
+    """
+    Write a new generation: old's first keep rows, then streams merged.
+
+    Items older than the kept rows go into late. Readers of the old
+    generation keep their files; they are only unlinked once meta.json
+    points at the new one.
+    """
+    import history
+
+    generation = old.get('generation', 0) + 1 if old else 1
+    meta = _empty_meta(generation)
+
+    prefix = {path: b'' for path in _paths(generation)}
+    if keep:
+        snap = Snapshot(old)
+        meta.update(count=keep, projects=old['projects'],
+                    last_ts=snap.columns['timestamp'][keep - 1],
+                    last_hashes=_last_hashes(snap, keep),
+                    heap_size=snap.columns['text_end'][keep - 1])
+        for name in COLUMNS:
+            prefix[column_path(name, generation)] = snap.columns[name][:keep]
+        prefix[heap_path(generation)] = snap.heap[:meta['heap_size']]
+
+    # Overwrites anything left by an interrupted rewrite
+    for path, data in prefix.items():
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    last = (meta['last_ts'], meta['last_hashes']) if keep else None
+    _append_all(meta, history.merge_sources(streams, late, last), workers)
+    _save_meta(meta)
+
+    current = {os.path.basename(path) for path in _paths(generation)}
+    for name in os.listdir(SNAPSHOT_DIR):
+        if name.endswith(('.col', '.bin')) and name not in current:
+            os.unlink(os.path.join(SNAPSHOT_DIR, name))
+    return meta
+
+
+def _merge(meta: dict, start: int, streams: list, workers: int, late: list) -> dict:
+    """
+    Merge streams older than the newest rows in, by rewriting from start on.
+
+    Columns must stay in timestamp order, so the rows from start on are
+    replayed and heap-merged with the new ones, and the days from then on
+    are summarized again.
+    """
+    keep = bisect_left(Snapshot(meta).columns['timestamp'], start)
+    _forget_days(start)
+    return _rewrite(meta, keep, [_replay(meta, keep), *streams], late, workers)
+
+
+def _forget_days(since_ts: float):
+    """Drop stored sums of finished days from since_ts's day on, as they are changing."""
+    day = date.fromtimestamp(since_ts / 1000)
+    if day < date.today():
+        storage.clear_day_hours(since=day.isoformat())
+
+
+def _replay(meta: dict, start: int):
+    """Stream the snapshot's rows from start on as items, as from ingest.read."""
+    import history
+
+    snap = Snapshot(meta)
+    c = snap.columns
+    for i in range(start, snap.count):
+        timestamp = c['timestamp'][i]
+        text = snap.text(i)
+        prompt = history.Prompt(
+            text=text,
+            timestamp=datetime.fromtimestamp(timestamp / 1000),
+            project=snap.projects[c['project'][i]],
+            has_paste=bool(c['paste'][i]),
+            raw_display=text
+        )
+        yield timestamp, prompt, (c['score'][i], CATEGORIES[c['category'][i]])
+
+
+def _last_hashes(snap: Snapshot, end: int) -> list:
+    """Hash the prompts sharing row end - 1's timestamp, as meta['last_hashes']."""
+    timestamps = snap.columns['timestamp']
+    start = bisect_left(timestamps, timestamps[end - 1], 0, end)
+    return sorted(storage.hash_prompt(snap.text(i), datetime.fromtimestamp(timestamps[i] / 1000))
+                  for i in range(start, end))
+
+
+@contextmanager
+def _locked():
+    """Hold the snapshot lock, so one process at a time syncs and writes."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(LOCK_PATH, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def update(workers: int = 1, sources: list[str] = None, cutoff_ts: float = None) -> Snapshot:
+    """
+    Read what is new in the history sources into the snapshot and map it.
+
+    sources and cutoff_ts are as for ingest.plan: archived segments ending
+    before cutoff_ts are left out until someone asks for them. Each source
+    is read in its own stream and the streams are heap-merged, dropping
+    repeats of a prompt across them; adding a source reads just that source.
+
+    Items stream through in storage.BATCH_SIZE batches per worker, so a
+    rebuild over a large history runs in flat memory. Prompts older than
+    ones already stored (lines written out of order, or a source lagging
+    behind) are merged in by rewriting from the oldest of them on, and
+    only the days from then on are summarized again. The snapshot is
+    rebuilt when ingest.plan says everything must be read again, or the
+    scorer or columns changed.
+    """
+    with _locked():
+        return _update(workers, sources, cutoff_ts)
+
+
+def _update(workers: int, sources: list[str], cutoff_ts: float = None) -> Snapshot:
+    """update, with the snapshot lock held."""
+    import history
+    import ingest
+
+    meta = None
+    if os.path.exists(META_PATH):
+        with open(META_PATH) as f:
+            meta = json.load(f)
+
+    stale = (meta is None
+             or meta.get('columns') != list(COLUMNS)
+             or meta['scorer_version'] != scoring.SCORER_VERSION)
+    rebuild, starts = ingest.plan(sources, stale, cutoff_ts)
+    streams, checkpoints = ingest.read(starts, workers)
+
+    # Peek at each source's first new prompt, to see where they go
+    heads = []
+    for stream in streams:
+        first = next(stream, None)
+        if first is not None:
+            heads.append((first[0], chain([first], stream)))
+    streams = [stream for _, stream in heads]
+
+    late = []
+    if rebuild:
+        storage.clear_day_hours()
+        meta = _rewrite(meta, 0, streams, late, workers)
+    elif heads and min(ts for ts, _ in heads) < meta['last_ts']:
+        meta = _merge(meta, min(ts for ts, _ in heads), streams, workers, late)
+    elif heads:
+        # The new prompts can still belong to days already summarized
+        _forget_days(min(ts for ts, _ in heads))
+        _truncate(meta)
+        last = (meta['last_ts'], meta['last_hashes'])
+        _append_all(meta, history.merge_sources(streams, late, last), workers)
+        _save_meta(meta)
+
+    if late:
+        # Lines too far out of order to be put back in place on the way
+        late.sort(key=itemgetter(0))
+        meta = _merge(meta, late[0][0], [iter(late)], workers, [])
+
+    ingest.save(checkpoints, rebuild)
+    return Snapshot(meta)
+
+
+def day_window(day: date) -> tuple:
+    """Get (start, end) epoch millis of a local calendar day."""
+    start = datetime.combine(day, time())
+    end = datetime.combine(day + timedelta(days=1), time())
+    return start.timestamp() * 1000, end.timestamp() * 1000
+
+
+def day_summaries(days: list, workers: int = 1, sources: list[str] = None) -> dict:
+    """
+    Get per-hour fatigue sums for whole calendar days.
+
+    Days before today are summarized once and kept in the store, so asking
+    again needs neither a sync nor the snapshot while every history source
+    still has the inode and size it was last read at. New lines drop the
+    stored days from the oldest of them on. Today is always computed fresh.
+
+    Returns:
+        Dict of date -> {hour of day: metrics.Aggregate}
+    """
+    today = date.today()
+    past = [day.isoformat() for day in days if day < today]
+    stored = storage.get_day_hours(past, scoring.SCORER_VERSION) if past else {}
+
+    if all(day.isoformat() in stored for day in days):
+        import ingest
+        # Sources can still gain lines for stored days (e.g. a late export),
+        # so any change to them means a sync first
+        rebuild, starts = ingest.plan(sources, cutoff_ts=day_window(min(days))[0])
+        if not rebuild and not starts:
+            return {day: _from_sums(stored[day.isoformat()]) for day in days}
+
+    # Store days under the lock, so a concurrent merge of late rows can't be
+    # followed by sums computed from the rows it replaced
+    with _locked():
+        snap = _update(workers, sources, day_window(min(days))[0])
+        if past:
+            # A rebuild or merge drops stored days, so look again
+            stored = storage.get_day_hours(past, scoring.SCORER_VERSION)
+
+        result = {}
+        for day in days:
+            if day.isoformat() in stored:
+                result[day] = _from_sums(stored[day.isoformat()])
+                continue
+
+            rows = snap.window(*day_window(day))
+            result[day] = metrics.hour_of_day_aggregates(snap.column_values(rows))
+            if day < today:
+                storage.store_day_hours(
+                    day.isoformat(),
+                    {hour: agg.sums() for hour, agg in result[day].items()},
+                    scoring.SCORER_VERSION)
+    return result
+
+
+def _from_sums(hours: dict) -> dict:
+    """Turn stored {hour: sums} back into {hour: metrics.Aggregate}."""
+    return {hour: metrics.Aggregate.from_sums(sums) for hour, sums in hours.items()}
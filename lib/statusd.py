@@ -0,0 +1,180 @@
+"""
+Statusline daemon - serves the current energy level over a Unix socket.
+
+Tails the history sources and keeps per-hour fatigue aggregates for today,
+so each statusline render is one socket round-trip instead of a fresh
+Python process reparsing the whole history. `fatigue --watch` reuses the
+same tracker to redraw the today view as prompts arrive.
+"""
+
+import os
+import signal
+import socket
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+import analyzer
+import history
+import history_sources
+import metrics
+import storage
+
+# $FATIGUE_SOCKET overrides it, e.g. to keep a sandbox off the real daemon
+SOCKET_PATH = os.environ.get('FATIGUE_SOCKET') or f'/tmp/claude-fatigue-{os.getuid()}.sock'
+
+# Energy reported before any prompts today
+DEFAULT_ENERGY = 50
+
+
+class EnergyTracker:
+    """Rolling per-hour fatigue aggregates for today's prompts."""
+
+    def __init__(self, sources: list[str] = None):
+        self.sources = sources
+        self.files = {}     # path -> (inode, size, offset) read up to
+        self.seen = set()   # Today's prompt hashes, to count repeats across sources once
+        self.day = None
+        self.hourly = defaultdict(metrics.Aggregate)
+        self.total = metrics.Aggregate()
+
+    def watched(self) -> list[str]:
+        """Get the files and directories whose changes can move the numbers."""
+        return self.sources or history_sources.default_sources()
+
+    def reset(self):
+        """Start over from today's first line in every history source."""
+        self.day = datetime.now().date()
+        self.files.clear()
+        self.seen.clear()
+        self.hourly.clear()
+        self.total = metrics.Aggregate()
+
+    def update(self) -> int:
+        """
+        Fold lines appended since the last update into the aggregates.
+
+        Only the new prompts are measured and scored. If a source was
+        replaced, truncated or removed, everything is read again.
+
+        Returns:
+            Number of prompts added
+        """
+        stats = {path: os.stat(path)
+                 for path in history_sources.resolve_sources(self.sources)}
+        if (self.day != datetime.now().date()
+                or any(path not in stats or self._replaced(path, stats[path])
+                       for path in self.files)):
+            self.reset()
+
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        cutoff_ts = today_start.timestamp() * 1000
+        archived = {} if self.files else history_sources.archived_offsets(list(stats))
+        return sum(self._read(path, st, cutoff_ts, archived.get(path, 0))
+                   for path, st in stats.items())
+
+    def _replaced(self, path: str, st: os.stat_result) -> bool:
+        """Check if a file no longer continues from what was read of it."""
+        inode, size, offset = self.files[path]
+        if history_sources.is_archive(path):
+            return (st.st_ino, st.st_size) != (inode, size)
+        return st.st_ino != inode or st.st_size < offset
+
+    def _read(self, path: str, st: os.stat_result, cutoff_ts: float, first: int) -> int:
+        """Add a file's prompts from today past where it was last read, or first."""
+        _, size, offset = self.files.get(path, (None, None, first))
+        if st.st_size == size:
+            return 0
+
+        # Start a plain file at today's first block rather than its top
+        if path not in self.files and not history_sources.is_archive(path):
+            start, _ = history.seek_range(history.load_index(path), cutoff_ts)
+            offset = max(offset, start)
+
+        added = 0
+        # Archived segments from before today are never opened past their header
+        if offset or history_sources.overlaps(path, cutoff_ts):
+            for offset, line in history.iter_lines(path, offset):
+                # Older lines are skipped on their timestamp alone, without decoding
+                timestamp = history.peek_timestamp(line)
+                if timestamp is not None and timestamp < cutoff_ts:
+                    continue
+
+                entry = history.parse_entry(line)
+                if entry is None or entry[0] < cutoff_ts:
+                    continue
+
+                prompt = history.make_prompt(entry[2], entry[0], entry[1], entry[3])
+                if prompt is None:
+                    continue
+
+                key = storage.hash_prompt(prompt.text, prompt.timestamp)
+                if key in self.seen:
+                    continue
+                self.seen.add(key)
+
+                measured = *metrics.measure(prompt.text), analyzer.score_prompt(prompt.text).total
+                self.hourly[prompt.timestamp.hour].add(*measured)
+                self.total.add(*measured)
+                added += 1
+
+        self.files[path] = (st.st_ino, st.st_size, offset)
+        return added
+
+    def hourly_metrics(self) -> dict:
+        """Get hour -> fatigue metrics (with 'fatigue') for today so far."""
+        return metrics.summarize(self.hourly)
+
+    def energy(self) -> int:
+        """Get energy (0-100) for the most recent active hour today."""
+        self.update()
+        if not self.hourly:
+            return DEFAULT_ENERGY
+
+        m = self.hourly[max(self.hourly)].metrics()
+        return max(0, min(100, int(100 - metrics.fatigue_index(m))))
+
+
+def _answers(socket_path: str) -> bool:
+    """Check if a daemon is listening on socket_path."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def serve(socket_path: str = SOCKET_PATH, sources: list[str] = None):
+    """
+    Answer each connection with the current energy, until killed.
+
+    sources are as for history_sources.resolve_sources.
+    """
+    if os.path.exists(socket_path):
+        if _answers(socket_path):
+            sys.exit(f"fatigue daemon already running on {socket_path}")
+        # Left behind by a daemon that died without cleaning up
+        os.unlink(socket_path)
+
+    tracker = EnergyTracker(sources)
+    tracker.update()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen()
+
+    # Clean up the socket when stopped normally
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                conn.sendall(f'{tracker.energy()}\n'.encode())
+    finally:
+        server.close()
+        os.unlink(socket_path)
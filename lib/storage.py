@@ -3,10 +3,12 @@ SQLite storage for historical scores and trend tracking.
 """
 
 import os
+import re
 import sqlite3
 import hashlib
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass
+from itertools import islice
 
 
 @dataclass
@@ -22,35 +24,285 @@ class StoredScore:
 
 DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'scores.db')
 
+# Scores live in one table per UTC month of the prompt's timestamp, so
+# windowed queries only open the months they cover and old months can be
+# dropped whole.
+PARTITION_PATTERN = re.compile(r'^scores_\d{4}_\d{2}$')
+
+# Pre-aggregated score sums, kept in step with the score partitions by
+# triggers. Maps rollup table -> SQL for a row's bucket ({row} is NEW, OLD
+# or a partition).
+ROLLUPS = {
+    # hour * 7 + day of week (0=Monday), local time
+    'rollup_hour_dow': (
+        "CAST(strftime('%H', {row}.timestamp, 'unixepoch', 'localtime') AS INTEGER) * 7"
+        " + (CAST(strftime('%w', {row}.timestamp, 'unixepoch', 'localtime') AS INTEGER) + 6) % 7"
+    ),
+    'rollup_weekly': "strftime('%Y-%W', {row}.timestamp, 'unixepoch')",
+}
+
+# Rollups since folded into rollup_hour_dow
+RETIRED_ROLLUPS = ['rollup_hourly', 'rollup_dow']
+
+# Scores have one decimal, so sums are kept exactly in tenths
+SCORE_TENTHS = "CAST(round({row}.score * 10) AS INTEGER)"
+
+# Rows per write transaction when streaming large inputs
+BATCH_SIZE = 5000
+
+# Bump when create_schema changes, so existing databases pick it up
+SCHEMA_VERSION = 5
+
+_storage = None
+
+
+class Storage:
+    """
+    One SQLite connection per process, set up once.
+
+    Keeping the connection open also keeps sqlite3's per-connection
+    statement cache warm, so repeated queries skip re-preparing.
+    """
+
+    def __init__(self, path: str = None):
+        path = path or DB_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.pid = os.getpid()
+        self.conn = sqlite3.connect(path, timeout=5)
+        self.conn.row_factory = sqlite3.Row
+
+        # WAL lets the statusline and a running report read while we write
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA cache_size = -16000")     # 16 MB
+        self.conn.execute("PRAGMA mmap_size = 268435456")   # 256 MB
+        self.conn.execute("PRAGMA temp_store = MEMORY")
+
+        # INSERT OR REPLACE only fires delete triggers with this on, and the
+        # rollups need them to stay correct
+        self.conn.execute("PRAGMA recursive_triggers = ON")
+
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            create_schema(self.conn)
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.conn.commit()
+
 
 def get_connection():
-    """Get database connection, creating tables if needed."""
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """Get this process's database connection, opening it on first use."""
+    global _storage
+    # A forked worker must not share its parent's connection
+    if _storage is None or _storage.pid != os.getpid():
+        _storage = Storage()
+    return _storage.conn
+
 
+def create_schema(conn):
+    """Create or upgrade tables, indexes and triggers. Safe to rerun."""
+    # Project names, interned so score partitions store a small integer
     conn.execute('''
-        CREATE TABLE IF NOT EXISTS scores (
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE
+        )
+    ''')
+
+    legacy = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scores'"
+    ).fetchone()
+    if legacy:
+        migrate_scores(conn)
+
+    for table in ROLLUPS:
+        create_rollup(conn, table)
+    for table in RETIRED_ROLLUPS:
+        for event in ('insert', 'delete', 'update'):
+            conn.execute(f"DROP TRIGGER IF EXISTS {table}_{event}")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+    # Raw history entries used to be copied in here. The snapshot now reads
+    # the history sources itself, so the copy is dropped and its space given
+    # back; VACUUM can't run inside a transaction.
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history'"
+    ).fetchone():
+        conn.execute("DROP TABLE history")
+        conn.commit()
+        conn.execute("VACUUM")
+
+    # How far into each history source the snapshot has read
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_state (
+            path TEXT PRIMARY KEY,
+            inode INTEGER,
+            size INTEGER,
+            offset INTEGER,
+            fingerprint BLOB
+        )
+    ''')
+
+    # Per-hour sums for days that are over, so past days never need a
+    # rescan. A finished day with no prompts has no day_hours rows.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS finished_days (
+            day TEXT PRIMARY KEY,
+            scorer_version TEXT
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS day_hours (
+            day TEXT,
+            hour INTEGER,
+            count INTEGER,
+            length INTEGER,
+            words INTEGER,
+            grunts INTEGER,
+            specificity INTEGER,
+            score REAL,
+            PRIMARY KEY (day, hour)
+        )
+    ''')
+
+
+def migrate_scores(conn):
+    """Move scores from the single scores table of schema < 4 into partitions."""
+    # Databases from before score caching lack the version column
+    columns = [row['name'] for row in conn.execute("PRAGMA table_info(scores)")]
+    if 'scorer_version' not in columns:
+        conn.execute("ALTER TABLE scores ADD COLUMN scorer_version TEXT")
+
+    conn.execute("INSERT OR IGNORE INTO projects (name) SELECT DISTINCT COALESCE(project, '') FROM scores")
+
+    months = [row[0] for row in conn.execute(
+        "SELECT DISTINCT strftime('%Y_%m', timestamp, 'unixepoch') FROM scores")]
+    for month in months:
+        partition = f'scores_{month}'
+        create_partition(conn, partition, triggers=False)
+        conn.execute(f'''
+            INSERT INTO {partition}
+            (prompt_hash, score, category, timestamp, project_id, text_preview,
+             created_at, scorer_version)
+            SELECT prompt_hash, score, category, timestamp, projects.id, text_preview,
+                   created_at, scorer_version
+            FROM scores JOIN projects ON projects.name = COALESCE(scores.project, '')
+            WHERE strftime('%Y_%m', timestamp, 'unixepoch') = ?
+        ''', (month,))
+
+    # Dropping the table drops its triggers; rollups are rebuilt from the
+    # partitions by create_rollup
+    conn.execute("DROP TABLE scores")
+    for table in ROLLUPS:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def partition_name(timestamp: int) -> str:
+    """Get the score partition for an epoch seconds timestamp."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('scores_%Y_%m')
+
+
+def list_partitions(conn) -> list[str]:
+    """Get every score partition, oldest first."""
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'scores_%'")]
+    return sorted(name for name in names if PARTITION_PATTERN.match(name))
+
+
+def partitions_between(conn, start_ts: int = None, end_ts: int = None) -> list[str]:
+    """Get the partitions that can hold scores in [start_ts, end_ts), oldest first."""
+    first = partition_name(start_ts) if start_ts is not None else ''
+    last = partition_name(end_ts) if end_ts is not None else '~'
+    return [name for name in list_partitions(conn) if first <= name <= last]
+
+
+def create_partition(conn, partition: str, triggers: bool = True):
+    """Create a score partition, its indexes and (optionally) its rollup triggers."""
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {partition} (
             prompt_hash TEXT PRIMARY KEY,
             score REAL,
             category TEXT,
             timestamp INTEGER,
-            project TEXT,
+            project_id INTEGER,
             text_preview TEXT,
-            created_at INTEGER DEFAULT (strftime('%s', 'now'))
+            created_at INTEGER DEFAULT (strftime('%s', 'now')),
+            scorer_version TEXT
         )
     ''')
 
-    conn.execute('''
-        CREATE INDEX IF NOT EXISTS idx_timestamp ON scores(timestamp)
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_{partition}_timestamp ON {partition}(timestamp)
     ''')
 
-    conn.execute('''
-        CREATE INDEX IF NOT EXISTS idx_project ON scores(project)
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_{partition}_project ON {partition}(project_id, timestamp)
     ''')
 
-    conn.commit()
-    return conn
+    if triggers:
+        for table in ROLLUPS:
+            create_rollup_triggers(conn, table, partition)
+
+
+def create_rollup(conn, table: str):
+    """Create a rollup table and its triggers, backfilling it if new."""
+    bucket = ROLLUPS[table]
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            bucket PRIMARY KEY,
+            count INTEGER,
+            score_tenths INTEGER
+        )
+    ''')
+
+    for partition in list_partitions(conn):
+        if not exists:
+            conn.execute(f'''
+                INSERT INTO {table} (bucket, count, score_tenths)
+                SELECT {bucket.format(row=partition)}, COUNT(*),
+                       SUM({SCORE_TENTHS.format(row=partition)})
+                FROM {partition} WHERE true GROUP BY 1
+                ON CONFLICT(bucket) DO UPDATE SET
+                    count = count + excluded.count,
+                    score_tenths = score_tenths + excluded.score_tenths
+            ''')
+        create_rollup_triggers(conn, table, partition)
+
+
+def create_rollup_triggers(conn, table: str, partition: str):
+    """Keep a rollup table in step with one score partition."""
+    bucket = ROLLUPS[table]
+    add = f'''
+        INSERT INTO {table} (bucket, count, score_tenths)
+        VALUES ({bucket.format(row='NEW')}, 1, {SCORE_TENTHS.format(row='NEW')})
+        ON CONFLICT(bucket) DO UPDATE SET
+            count = count + 1,
+            score_tenths = score_tenths + excluded.score_tenths;
+    '''
+    remove = f'''
+        UPDATE {table} SET
+            count = count - 1,
+            score_tenths = score_tenths - {SCORE_TENTHS.format(row='OLD')}
+        WHERE bucket = {bucket.format(row='OLD')};
+    '''
+
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {partition}_{table}_insert "
+                 f"AFTER INSERT ON {partition} BEGIN {add} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {partition}_{table}_delete "
+                 f"AFTER DELETE ON {partition} BEGIN {remove} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {partition}_{table}_update "
+                 f"AFTER UPDATE OF score, timestamp ON {partition} BEGIN {remove} {add} END")
+
+
+def chunked(iterable, size: int = BATCH_SIZE):
+    """Split an iterable into lists of at most size items."""
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
 
 
 def hash_prompt(text: str, timestamp: datetime) -> str:
@@ -62,72 +314,202 @@ def hash_prompt(text: str, timestamp: datetime) -> str:
 def store_score(text: str, score: float, category: str,
                 timestamp: datetime, project: str):
     """Store a score in the database."""
-    conn = get_connection()
-    prompt_hash = hash_prompt(text, timestamp)
-    preview = text[:100] + '...' if len(text) > 100 else text
-
-    conn.execute('''
-        INSERT OR REPLACE INTO scores
-        (prompt_hash, score, category, timestamp, project, text_preview)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (prompt_hash, score, category, int(timestamp.timestamp()),
-          project, preview))
-
-    conn.commit()
-    conn.close()
-
-
-def store_scores_batch(scores: list):
+    store_scores_batch([(text, score, category, timestamp, project)])
+
+
+def intern_projects(conn, names) -> dict:
+    """Get project name -> id, adding names not seen before."""
+    names = list(set(names))
+    conn.executemany("INSERT OR IGNORE INTO projects (name) VALUES (?)",
+                     [(name,) for name in names])
+    ids = {}
+    # Stay well under SQLite's bound parameter limit
+    for i in range(0, len(names), 500):
+        chunk = names[i:i + 500]
+        for row in conn.execute(f'''
+            SELECT id, name FROM projects WHERE name IN ({','.join('?' * len(chunk))})
+        ''', chunk):
+            ids[row['name']] = row['id']
+    return ids
+
+
+def store_scores_batch(scores: list, scorer_version: str = None) -> dict:
     """
     Store multiple scores efficiently.
 
+    Rows are staged in a temp table and upserted into their month's
+    partition in one transaction. Rows whose score and scorer version are
+    unchanged are left alone, so their pages, indexes and rollups are not
+    rewritten.
+
     Args:
         scores: List of (text, score, category, timestamp, project) tuples
+        scorer_version: Version of the scorer that produced them
+
+    Returns:
+        Dict with counts of rows inserted, updated and skipped
     """
     conn = get_connection()
 
-    records = []
-    for text, score, category, timestamp, project in scores:
-        prompt_hash = hash_prompt(text, timestamp)
-        preview = text[:100] + '...' if len(text) > 100 else text
-        records.append((prompt_hash, score, category,
-                       int(timestamp.timestamp()), project, preview))
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS staged_scores (
+            prompt_hash TEXT PRIMARY KEY,
+            score REAL,
+            category TEXT,
+            timestamp INTEGER,
+            project_id INTEGER,
+            text_preview TEXT,
+            scorer_version TEXT,
+            partition TEXT
+        )
+    ''')
 
-    conn.executemany('''
-        INSERT OR REPLACE INTO scores
-        (prompt_hash, score, category, timestamp, project, text_preview)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', records)
+    inserted = updated = staged = 0
+    with conn:
+        project_ids = intern_projects(conn, (row[4] or '' for row in scores))
+
+        records = []
+        for text, score, category, timestamp, project in scores:
+            prompt_hash = hash_prompt(text, timestamp)
+            preview = text[:100] + '...' if len(text) > 100 else text
+            epoch = int(timestamp.timestamp())
+            records.append((prompt_hash, score, category, epoch, project_ids[project or ''],
+                            preview, scorer_version, partition_name(epoch)))
+
+        conn.execute("DELETE FROM staged_scores")
+        conn.executemany('''
+            INSERT OR REPLACE INTO staged_scores
+            (prompt_hash, score, category, timestamp, project_id, text_preview,
+             scorer_version, partition)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', records)
+        staged = conn.execute("SELECT COUNT(*) FROM staged_scores").fetchone()[0]
+
+        partitions = [row[0] for row in conn.execute(
+            "SELECT DISTINCT partition FROM staged_scores")]
+        for partition in partitions:
+            create_partition(conn, partition)
+
+            inserted += conn.execute(f'''
+                SELECT COUNT(*) FROM staged_scores s
+                WHERE s.partition = ?
+                AND NOT EXISTS (SELECT 1 FROM {partition} WHERE prompt_hash = s.prompt_hash)
+            ''', (partition,)).fetchone()[0]
+            updated += conn.execute(f'''
+                SELECT COUNT(*) FROM staged_scores s JOIN {partition} p USING (prompt_hash)
+                WHERE s.score != p.score
+                OR s.scorer_version IS NOT p.scorer_version
+            ''').fetchone()[0]
+
+            # WHERE keeps the SELECT from swallowing the ON CONFLICT clause
+            conn.execute(f'''
+                INSERT INTO {partition}
+                (prompt_hash, score, category, timestamp, project_id, text_preview,
+                 scorer_version)
+                SELECT prompt_hash, score, category, timestamp, project_id,
+                       text_preview, scorer_version
+                FROM staged_scores WHERE partition = ?
+                ON CONFLICT(prompt_hash) DO UPDATE SET
+                    score = excluded.score,
+                    category = excluded.category,
+                    scorer_version = excluded.scorer_version
+                WHERE excluded.score != {partition}.score
+                OR excluded.scorer_version IS NOT {partition}.scorer_version
+            ''', (partition,))
+
+    return {'inserted': inserted, 'updated': updated,
+            'skipped': staged - inserted - updated}
+
+
+def get_cached_scores(hashes: list, scorer_version: str, timestamps: list = None) -> dict:
+    """
+    Look up scores already stored by the current scorer.
 
-    conn.commit()
-    conn.close()
+    Args:
+        hashes: Prompt hashes to look up
+        scorer_version: Only scores stamped with this version count
+        timestamps: The prompts' datetimes, in hash order, so each lookup
+            only opens its own month's partition; without them every
+            partition is searched
+
+    Returns:
+        Dict of prompt_hash -> (score, category) for the hashes found
+    """
+    conn = get_connection()
+    partitions = list_partitions(conn)
+
+    if timestamps is None:
+        wanted = {partition: hashes for partition in partitions}
+    else:
+        existing = set(partitions)
+        wanted = {}
+        for prompt_hash, timestamp in zip(hashes, timestamps):
+            partition = partition_name(int(timestamp.timestamp()))
+            if partition in existing:
+                wanted.setdefault(partition, []).append(prompt_hash)
+
+    cached = {}
+    for partition, part_hashes in wanted.items():
+        # Stay well under SQLite's bound parameter limit
+        for i in range(0, len(part_hashes), 500):
+            chunk = part_hashes[i:i + 500]
+            rows = conn.execute(f'''
+                SELECT prompt_hash, score, category FROM {partition}
+                WHERE scorer_version = ?
+                AND prompt_hash IN ({','.join('?' * len(chunk))})
+            ''', [scorer_version, *chunk]).fetchall()
+            for row in rows:
+                cached[row['prompt_hash']] = (row['score'], row['category'])
+
+    return cached
+
+
+def get_project_ids(project: str) -> list[int]:
+    """Get the ids of projects whose name contains project (any case)."""
+    conn = get_connection()
+    return [row[0] for row in conn.execute(
+        "SELECT id FROM projects WHERE name LIKE ?", (f"%{project}%",))]
 
 
 def get_scores(days: int = None, project: str = None,
                limit: int = None) -> list[StoredScore]:
-    """Get scores from database with optional filters."""
+    """
+    Get scores from database with optional filters, newest first.
+
+    Only the partitions inside the window are read, newest first, stopping
+    once limit rows are found. A project filter is resolved to ids against
+    the small projects table, then seeks each partition's project index.
+    """
     conn = get_connection()
 
-    query = "SELECT * FROM scores WHERE 1=1"
+    cutoff = None
+    where = "WHERE 1=1"
     params = []
 
     if days:
         cutoff = int((datetime.now() - timedelta(days=days)).timestamp())
-        query += " AND timestamp >= ?"
+        where += " AND s.timestamp >= ?"
         params.append(cutoff)
 
     if project:
-        query += " AND project LIKE ?"
-        params.append(f"%{project}%")
-
-    query += " ORDER BY timestamp DESC"
-
-    if limit:
-        query += " LIMIT ?"
-        params.append(limit)
-
-    rows = conn.execute(query, params).fetchall()
-    conn.close()
+        ids = get_project_ids(project)
+        if not ids:
+            return []
+        where += f" AND s.project_id IN ({','.join('?' * len(ids))})"
+        params.extend(ids)
+
+    rows = []
+    for partition in reversed(partitions_between(conn, cutoff)):
+        query = f'''
+            SELECT s.*, p.name AS project FROM {partition} s
+            JOIN projects p ON p.id = s.project_id
+            {where} ORDER BY s.timestamp DESC
+        '''
+        if limit:
+            query += f" LIMIT {int(limit - len(rows))}"
+        rows.extend(conn.execute(query, params).fetchall())
+        if limit and len(rows) >= limit:
+            break
 
     return [StoredScore(
         prompt_hash=row['prompt_hash'],
@@ -145,80 +527,205 @@ def get_weekly_averages(weeks: int = 8) -> list[dict]:
 
     cutoff = int((datetime.now() - timedelta(weeks=weeks)).timestamp())
 
+    # Reads whole weeks, so the oldest one is not cut off mid-week
     rows = conn.execute('''
         SELECT
-            strftime('%Y-%W', timestamp, 'unixepoch') as week,
-            AVG(score) as avg_score,
-            COUNT(*) as count
-        FROM scores
-        WHERE timestamp >= ?
-        GROUP BY week
-        ORDER BY week
+            bucket as week,
+            score_tenths / 10.0 / count as avg_score,
+            count
+        FROM rollup_weekly
+        WHERE bucket >= strftime('%Y-%W', ?, 'unixepoch') AND count > 0
+        ORDER BY bucket
     ''', (cutoff,)).fetchall()
 
-    conn.close()
 
     return [{'week': row['week'], 'avg_score': row['avg_score'],
              'count': row['count']} for row in rows]
 
 
-def get_hourly_stats() -> dict:
-    """Get average scores by hour of day."""
+def get_hour_dow_matrix() -> list[list[dict]]:
+    """
+    Get average scores for every hour of day x day of week.
+
+    Returns:
+        24 rows (hour) of 7 cells (0=Monday), each {'avg_score', 'count'}
+    """
     conn = get_connection()
 
     rows = conn.execute('''
-        SELECT
-            CAST(strftime('%H', timestamp, 'unixepoch', 'localtime') AS INTEGER) as hour,
-            AVG(score) as avg_score,
-            COUNT(*) as count
-        FROM scores
-        GROUP BY hour
-        ORDER BY hour
+        SELECT bucket, score_tenths, count
+        FROM rollup_hour_dow
+        WHERE count > 0
     ''').fetchall()
 
-    conn.close()
 
-    return {row['hour']: {'avg_score': row['avg_score'], 'count': row['count']}
-            for row in rows}
+    matrix = [[{'avg_score': 0.0, 'count': 0} for _ in range(7)] for _ in range(24)]
+    for row in rows:
+        hour, dow = divmod(row['bucket'], 7)
+        matrix[hour][dow] = {'avg_score': row['score_tenths'] / 10 / row['count'],
+                             'count': row['count']}
+    return matrix
 
 
-def get_day_of_week_stats() -> dict:
-    """Get average scores by day of week (0=Monday, 6=Sunday)."""
-    conn = get_connection()
+def _collapse(cells) -> dict:
+    """Combine matrix cells into one {'avg_score', 'count'}, or None if empty."""
+    count = sum(c['count'] for c in cells)
+    if not count:
+        return None
+    return {'avg_score': sum(c['avg_score'] * c['count'] for c in cells) / count,
+            'count': count}
 
-    rows = conn.execute('''
-        SELECT
-            CAST(strftime('%w', timestamp, 'unixepoch', 'localtime') AS INTEGER) as dow,
-            AVG(score) as avg_score,
-            COUNT(*) as count
-        FROM scores
-        GROUP BY dow
-        ORDER BY dow
-    ''').fetchall()
 
-    conn.close()
+def hourly_from_matrix(matrix: list[list[dict]]) -> dict:
+    """Collapse an hour x day matrix to stats by hour of day."""
+    hourly = {hour: _collapse(row) for hour, row in enumerate(matrix)}
+    return {hour: stats for hour, stats in hourly.items() if stats}
 
-    # Convert Sunday=0 to Monday=0 format
-    result = {}
-    for row in rows:
-        dow = (row['dow'] - 1) % 7  # Shift so Monday=0
-        result[dow] = {'avg_score': row['avg_score'], 'count': row['count']}
 
-    return result
+def dow_from_matrix(matrix: list[list[dict]]) -> dict:
+    """Collapse an hour x day matrix to stats by day of week (0=Monday)."""
+    daily = {dow: _collapse([row[dow] for row in matrix]) for dow in range(7)}
+    return {dow: stats for dow, stats in daily.items() if stats}
+
+
+def get_hourly_stats() -> dict:
+    """Get average scores by hour of day."""
+    return hourly_from_matrix(get_hour_dow_matrix())
+
+
+def get_day_of_week_stats() -> dict:
+    """Get average scores by day of week (0=Monday, 6=Sunday)."""
+    return dow_from_matrix(get_hour_dow_matrix())
 
 
 def get_score_count() -> int:
     """Get total number of stored scores."""
     conn = get_connection()
-    count = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
-    conn.close()
-    return count
+    return sum(conn.execute(f"SELECT COUNT(*) FROM {partition}").fetchone()[0]
+               for partition in list_partitions(conn))
 
 
 def clear_old_scores(days: int = 365):
-    """Remove scores older than N days."""
+    """
+    Remove scores older than N days.
+
+    Months that are wholly older are dropped as tables, after taking their
+    sums out of the rollups in one grouped statement each; only the month
+    straddling the cutoff is trimmed row by row.
+    """
     conn = get_connection()
     cutoff = int((datetime.now() - timedelta(days=days)).timestamp())
-    conn.execute("DELETE FROM scores WHERE timestamp < ?", (cutoff,))
+    boundary = partition_name(cutoff)
+
+    with conn:
+        for partition in list_partitions(conn):
+            if partition > boundary:
+                break
+            if partition == boundary:
+                conn.execute(f"DELETE FROM {partition} WHERE timestamp < ?", (cutoff,))
+                continue
+
+            for table, bucket in ROLLUPS.items():
+                conn.execute(f'''
+                    INSERT INTO {table} (bucket, count, score_tenths)
+                    SELECT {bucket.format(row=partition)}, -COUNT(*),
+                           -SUM({SCORE_TENTHS.format(row=partition)})
+                    FROM {partition} WHERE true GROUP BY 1
+                    ON CONFLICT(bucket) DO UPDATE SET
+                        count = count + excluded.count,
+                        score_tenths = score_tenths + excluded.score_tenths
+                ''')
+            conn.execute(f"DROP TABLE {partition}")
+
+
+def get_ingest_states() -> dict:
+    """Get the read checkpoint of every history source, by path."""
+    conn = get_connection()
+    return {row['path']: {'inode': row['inode'], 'size': row['size'],
+                          'offset': row['offset'], 'fingerprint': row['fingerprint']}
+            for row in conn.execute("SELECT * FROM ingest_state")}
+
+
+def save_ingest_states(states: dict, reset: bool = False):
+    """
+    Store read checkpoints for history sources.
+
+    Args:
+        states: Path -> (inode, size, offset, fingerprint): the inode and
+            size of the file when it was read, the byte offset just past
+            the last entry read, and the bytes just before that offset, to
+            spot in-place rewrites
+        reset: Drop every other checkpoint first (everything was read again)
+    """
+    conn = get_connection()
+    if reset:
+        conn.execute("DELETE FROM ingest_state")
+    conn.executemany('''
+        INSERT OR REPLACE INTO ingest_state
+        (path, inode, size, offset, fingerprint)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(path, *state) for path, state in states.items()])
+    conn.commit()
+
+
+def get_day_hours(days: list, scorer_version: str) -> dict:
+    """
+    Get stored per-hour sums for finished days.
+
+    Args:
+        days: 'YYYY-MM-DD' strings
+        scorer_version: Only days summarized with this scorer count
+
+    Returns:
+        Dict of day -> {hour: (count, length, words, grunts, specificity, score)}
+        for the days that are stored; missing days are left out
+    """
+    conn = get_connection()
+    placeholders = ','.join('?' * len(days))
+    result = {row['day']: {} for row in conn.execute(f'''
+        SELECT day FROM finished_days
+        WHERE day IN ({placeholders}) AND scorer_version = ?
+    ''', (*days, scorer_version))}
+
+    for row in conn.execute(f'''
+        SELECT day, hour, count, length, words, grunts, specificity, score
+        FROM day_hours WHERE day IN ({placeholders})
+    ''', days):
+        if row['day'] in result:
+            result[row['day']][row['hour']] = tuple(row)[2:]
+    return result
+
+
+def store_day_hours(day: str, hours: dict, scorer_version: str):
+    """
+    Store a finished day's per-hour sums, replacing any older ones.
+
+    Args:
+        day: 'YYYY-MM-DD'
+        hours: Hour -> (count, length, words, grunts, specificity, score)
+        scorer_version: Scorer the sums were computed with
+    """
+    conn = get_connection()
+    conn.execute("DELETE FROM day_hours WHERE day = ?", (day,))
+    conn.executemany('''
+        INSERT INTO day_hours
+        (day, hour, count, length, words, grunts, specificity, score)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(day, hour, *sums) for hour, sums in hours.items()])
+    conn.execute('''
+        INSERT OR REPLACE INTO finished_days (day, scorer_version) VALUES (?, ?)
+    ''', (day, scorer_version))
+    conn.commit()
+
+
+def clear_day_hours(since: str = None):
+    """
+    Forget finished-day sums, e.g. after history was rescanned.
+
+    Args:
+        since: Only forget this 'YYYY-MM-DD' day and later ones
+    """
+    conn = get_connection()
+    conn.execute("DELETE FROM finished_days WHERE day >= ?", (since or '',))
+    conn.execute("DELETE FROM day_hours WHERE day >= ?", (since or '',))
     conn.commit()
-    conn.close()
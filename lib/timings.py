@@ -0,0 +1,93 @@
+"""
+Run instrumentation - per-stage wall time and counters behind --timings.
+
+Everything is a no-op until enable() is called. Hot loops keep plain local
+tallies and report them once at the end, so a disabled run pays for a
+flag check per stage or batch, never per line.
+"""
+
+import time
+from contextlib import contextmanager
+
+enabled = False
+
+# Stage name -> [seconds, calls], in the order stages first ran
+_stages = {}
+
+# Counter name -> total
+_counts = {}
+
+
+def enable():
+    """Start recording stages and counters."""
+    global enabled
+    enabled = True
+
+
+def init_worker(on: bool):
+    """Pool initializer: follow the parent's setting, with empty totals."""
+    global enabled
+    enabled = on
+    _stages.clear()
+    _counts.clear()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a stage. Stages may nest; each is timed inclusively."""
+    if not enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = _stages.setdefault(name, [0.0, 0])
+        total[0] += time.perf_counter() - start
+        total[1] += 1
+
+
+def count(name: str, n: int = 1):
+    """Add n to a counter."""
+    if enabled and n:
+        _counts[name] = _counts.get(name, 0) + n
+
+
+def take_counts() -> dict:
+    """Get and reset the counters, e.g. to send them back from a pool worker."""
+    counts = dict(_counts)
+    _counts.clear()
+    return counts
+
+
+def add_counts(counts: dict):
+    """Add counters collected elsewhere, e.g. by take_counts in a worker."""
+    for name, n in counts.items():
+        count(name, n)
+
+
+def summary() -> dict:
+    """Get everything recorded, for --json output."""
+    return {
+        'stages': {name: {'seconds': round(seconds, 4), 'calls': calls}
+                   for name, (seconds, calls) in _stages.items()},
+        'counters': dict(_counts),
+    }
+
+
+def format_table() -> str:
+    """Format everything recorded as a plain text table."""
+    lines = ["TIMINGS", "=" * 44]
+    lines.append(f"{'Stage':28s} {'Seconds':>8s} {'Calls':>6s}")
+    lines.append("-" * 44)
+    for name, (seconds, calls) in _stages.items():
+        lines.append(f"{name:28s} {seconds:8.3f} {calls:6d}")
+
+    if _counts:
+        lines.append("")
+        lines.append(f"{'Counter':28s} {'Total':>15s}")
+        lines.append("-" * 44)
+        for name, n in _counts.items():
+            lines.append(f"{name:28s} {n:15,d}")
+    return '\n'.join(lines)
@@ -0,0 +1,126 @@
+"""
+File change notification - wakes up when a history source is written.
+
+Uses Linux inotify through ctypes, so waiting costs nothing while idle.
+Elsewhere, or if inotify is unavailable, falls back to polling the files'
+sizes and mtimes.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from typing import Iterator
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event: wd, mask, cookie, len, then len bytes of name
+EVENT_HEADER = struct.Struct('iIII')
+
+# Seconds between stat calls when polling
+POLL_INTERVAL = 1.0
+
+# Seconds after which a change is reported anyway (e.g. to roll over at midnight)
+REFRESH_INTERVAL = 60.0
+
+
+def _inotify(paths: list[str]) -> tuple:
+    """
+    Get an inotify fd watching paths, or None if unavailable.
+
+    Files are watched through their directory, so that a replaced or
+    newly created history file is still noticed; a directory is watched
+    for any file in it. Paths whose directory doesn't exist are left out.
+
+    Returns:
+        (fd, {watch descriptor: names of interest}), None in the names
+        standing for any name
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+
+    watches = {}
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            directory, name = path, None
+        else:
+            directory, name = os.path.dirname(path), os.fsencode(os.path.basename(path))
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            watches.setdefault(wd, set()).add(name)
+
+    if not watches:
+        os.close(fd)
+        return None
+    return fd, watches
+
+
+def _events(data: bytes) -> list[tuple]:
+    """Get (watch descriptor, file name) for a buffer of inotify events."""
+    events = []
+    offset = 0
+    while offset < len(data):
+        wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        events.append((wd, data[offset:offset + length].rstrip(b'\0')))
+        offset += length
+    return events
+
+
+def _stat(path: str) -> tuple:
+    try:
+        if os.path.isdir(path):
+            return tuple(sorted((entry.name, *_stat(entry.path)) for entry in os.scandir(path)
+                                if entry.is_file()))
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def changes(paths: list[str], timeout: float = REFRESH_INTERVAL) -> Iterator[None]:
+    """
+    Yield once straight away, then each time a file in paths may have changed.
+
+    paths are files or directories of them. Also yields after timeout
+    seconds without any change.
+    """
+    yield
+
+    watcher = _inotify(paths)
+    if watcher is None:
+        last = [_stat(path) for path in paths]
+        waited = 0.0
+        while True:
+            time.sleep(POLL_INTERVAL)
+            waited += POLL_INTERVAL
+            current = [_stat(path) for path in paths]
+            if current != last or waited >= timeout:
+                last = current
+                waited = 0.0
+                yield
+        return
+
+    fd, watches = watcher
+    try:
+        while True:
+            ready, _, _ = select.select([fd], [], [], timeout)
+            if ready and not any(None in watches.get(wd, ()) or name in watches.get(wd, ())
+                                 for wd, name in _events(os.read(fd, 65536))):
+                continue
+            yield
+    finally:
+        os.close(fd)
@@ -2,7 +2,7 @@
 # Prompt Fatigue statusline with gauge bar
 cat > /dev/null
 
-CACHE_FILE="/tmp/claude-fatigue-status"
+CACHE_FILE="${FATIGUE_STATUS_CACHE:-/tmp/claude-fatigue-status}"
 CACHE_AGE=300
 
 # Colors
@@ -13,60 +13,47 @@ RED='\033[31m'
 DIM='\033[2m'
 RESET='\033[0m'
 
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+
 get_fatigue_data() {
-    python3 << 'PYTHON'
-import json, os, re
+    FATIGUE_LIB="$SCRIPT_DIR/lib" python3 << 'PYTHON'
+import os, sys
 from datetime import datetime
-from collections import defaultdict
-
-history_file = os.path.expanduser("~/.claude/history.jsonl")
-today = datetime.now().date()
-hourly_texts = defaultdict(list)
 
-GRUNT_PATTERNS = ['yes', 'no', 'ok', 'okay', 'sure', 'continue', 'go',
-                  'do it', 'good', 'great', 'nice', 'thanks', "let's do it",
-                  "let's go", 'sounds good']
+sys.path.insert(0, os.environ['FATIGUE_LIB'])
+import history
+import metrics
 
-with open(history_file) as f:
-    for line in f:
-        try:
-            entry = json.loads(line)
-            ts = datetime.fromtimestamp(entry.get('timestamp', 0) / 1000)
-            if ts.date() == today:
-                text = entry.get('display', '')
-                if text and not text.startswith('/'):
-                    hourly_texts[ts.hour].append(text)
-        except json.JSONDecodeError:
-            pass
+# Only the newest active hour of today matters, so read backwards from the
+# end of the file and stop as soon as we leave it
+today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+agg = metrics.Aggregate()
+hour_start = None
+for prompt in history.read_history_reverse(cutoff_ts=today_start.timestamp() * 1000):
+    if hour_start is None:
+        hour_start = prompt.timestamp.replace(minute=0, second=0, microsecond=0)
+    elif prompt.timestamp < hour_start:
+        break
+    agg.add(*metrics.measure(prompt.text))
 
-if not hourly_texts:
+if not agg.count:
     print("50")
     exit()
 
 # Use the same formula as the main fatigue tool
-last_hour = max(hourly_texts.keys())
-texts = hourly_texts[last_hour]
-lengths = [len(t) for t in texts]
-avg_length = sum(lengths) / len(lengths)
-grunts = sum(1 for t in texts if t.lower().strip().rstrip('.!') in GRUNT_PATTERNS or len(t) < 15)
-grunt_ratio = grunts / len(texts)
-specificity = 0
-for t in texts:
-    specificity += len(re.findall(r'\b\w+\.(py|js|ts|tsx|go|rs|java|cpp)\b', t, re.I))
-    specificity += len(re.findall(r'`[^`]+`', t))
-spec_per_prompt = specificity / len(texts)
-
-length_fatigue = max(0, min(100, 100 - (avg_length / 2)))
-grunt_fatigue = grunt_ratio * 100
-spec_fatigue = max(0, min(100, 100 - (spec_per_prompt * 50)))
-fatigue = (length_fatigue * 0.4) + (grunt_fatigue * 0.4) + (spec_fatigue * 0.2)
-energy = int(100 - fatigue)
+energy = int(100 - metrics.fatigue_index(agg.metrics()))
 print(max(0, min(100, energy)))
 PYTHON
 }
 
-# Check cache
-if [ -f "$CACHE_FILE" ]; then
+# A running `fatigue --daemon` answers instantly and is always current
+SOCKET="${FATIGUE_SOCKET:-/tmp/claude-fatigue-$(id -u).sock}"
+if [ -S "$SOCKET" ] && command -v nc > /dev/null; then
+    ENERGY=$(nc -U "$SOCKET" < /dev/null 2> /dev/null)
+fi
+
+# Otherwise fall back to a cached reparse
+if [ -z "$ENERGY" ] && [ -f "$CACHE_FILE" ]; then
     CACHE_TIME=$(stat -f %m "$CACHE_FILE" 2>/dev/null || stat -c %Y "$CACHE_FILE" 2>/dev/null)
     NOW=$(date +%s)
     if [ $((NOW - CACHE_TIME)) -lt "$CACHE_AGE" ]; then